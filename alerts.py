@@ -0,0 +1,313 @@
+"""Warnungen bei Grenzwerten, Sprüngen und Ausreißern, mit laufenden Statistiken je Messwert.
+
+Für Gewicht, Blutzucker und Schlaf werden fortlaufend Anzahl, Mittelwert
+und Varianz (Welford), ein exponentiell gleitender Mittelwert (EWMA) sowie
+Minimum und Maximum im Zeitfenster (monotone Warteschlangen) geführt. Jeder
+neue Messwert wird gegen den Stand vor ihm geprüft:
+
+- niedrig/hoch: außerhalb der Grenzen aus RULES (z.B. Blutzucker 70-180 mg/dL)
+- Sprung: mehr als jump von Minimum/Maximum im Zeitfenster entfernt
+- Ausreißer: mehr als Z_SCORE Standardabweichungen vom EWMA entfernt
+
+evaluate() arbeitet wie der Spalten-Cache alle Einträge ab, deren id größer
+als die zuletzt geprüfte ist, egal ob sie aus dem Formular, einem Import,
+der Messwert-Annahme oder einem anderen Prozess stammen. Einzelne Werte
+kosten O(1), große Mengen werden blockweise mit NumPy/pandas ausgewertet
+(gleiches Ergebnis). Der Zustand liegt in alert_state; nach einem Neustart
+geht es dort weiter. Spätere Änderungen oder Löschungen fließen nicht mehr
+ein, reset() wertet die ganze Historie neu aus. Verdichtete Zeilen
+(retention.py) stehen für bereits geprüfte Werte und werden übersprungen.
+"""
+import json
+import math
+import threading
+from collections import deque
+
+import numpy as np
+
+import database
+from perf import timed
+
+DAY = 86400
+# Messwert -> Anzeige, Grenzen (None = keine), Sprungweite und Zeitfenster für Min/Max in Sekunden
+RULES = {
+    "weight": {"label": "Gewicht", "unit": "kg", "low": None, "high": None, "jump": 2.0, "window": 7 * DAY},
+    "blood_sugar": {"label": "Blutzucker", "unit": "mg/dL", "low": 70.0, "high": 180.0, "jump": None, "window": DAY},
+    "sleep_hours": {"label": "Schlaf", "unit": "h", "low": 4.0, "high": 12.0, "jump": None, "window": 7 * DAY},
+}
+METRICS = tuple(RULES)
+EWMA_ALPHA = 0.1
+Z_SCORE = 4.0
+# Ausreißer erst, wenn die Streuung aus genügend Werten geschätzt ist
+MIN_SAMPLES = 30
+# Ab so vielen Zeilen pro Block wird vektorisiert gerechnet
+VECTOR_MIN_ROWS = 256
+# Zeilen pro Transaktion
+CHUNK_SIZE = 100000
+
+ROWS_SQL = "SELECT id, ts, weight, blood_sugar, sleep_hours, samples FROM entry WHERE id > ? ORDER BY id LIMIT ?"
+INSERT_SQL = "INSERT INTO alert (entry_id, ts, metric, kind, value, message) VALUES (?, ?, ?, ?, ?, ?)"
+SAVE_STATE_SQL = '''
+    INSERT INTO alert_state (metric, last_id, state) VALUES (?, ?, ?)
+    ON CONFLICT (metric) DO UPDATE SET last_id = excluded.last_id, state = excluded.state
+'''
+
+_lock = threading.Lock()
+
+
+class MetricState:
+    """Laufende Statistik eines Messwerts.
+
+    update() prüft und übernimmt einen Wert in O(1) (amortisiert),
+    update_many() dasselbe für viele Werte mit NumPy. Werte, die zeitlich
+    vor dem neuesten bisherigen liegen (nachgetragene Importe), zählen für
+    Mittelwert, Varianz und EWMA, aber nicht für das Zeitfenster.
+    """
+
+    def __init__(self, metric, state=None):
+        state = state or {}
+        self.metric = metric
+        self.rule = RULES[metric]
+        self.n = state.get("n", 0)
+        self.mean = state.get("mean", 0.0)
+        self.m2 = state.get("m2", 0.0)
+        self.ewma = state.get("ewma")
+        self.last_ts = state.get("last_ts")
+        # (ts, Wert) mit steigenden bzw. fallenden Werten: Kandidaten für Min bzw. Max im Zeitfenster
+        self.lows = deque(tuple(item) for item in state.get("lows", ()))
+        self.highs = deque(tuple(item) for item in state.get("highs", ()))
+
+    def to_dict(self):
+        return {"n": self.n, "mean": self.mean, "m2": self.m2, "ewma": self.ewma, "last_ts": self.last_ts,
+                "lows": list(self.lows), "highs": list(self.highs)}
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def window(self, ts):
+        """(Minimum, Maximum) der Werte im Zeitfenster bis ts oder None."""
+        start = ts - self.rule["window"]
+        for queue in (self.lows, self.highs):
+            while queue and queue[0][0] < start:
+                queue.popleft()
+        return (self.lows[0][1], self.highs[0][1]) if self.lows else None
+
+    def _in_order(self, ts):
+        return self.last_ts is None or ts >= self.last_ts
+
+    def update(self, ts, value):
+        """Prüft value gegen den bisherigen Stand und übernimmt ihn; gibt [(Art, Meldung)] zurück."""
+        rule = self.rule
+        alerts = []
+        if rule["low"] is not None and value < rule["low"]:
+            alerts.append(("niedrig", self._message(value, f"unter {rule['low']:g}")))
+        if rule["high"] is not None and value > rule["high"]:
+            alerts.append(("hoch", self._message(value, f"über {rule['high']:g}")))
+        in_order = self._in_order(ts)
+        if rule["jump"] is not None and in_order:
+            extremes = self.window(ts)
+            if extremes and (value < extremes[0] - rule["jump"] or value > extremes[1] + rule["jump"]):
+                alerts.append(("Sprung", self._jump_message(value, *extremes)))
+        std = self.std
+        if self.n >= MIN_SAMPLES and std > 0 and abs(value - self.ewma) > Z_SCORE * std:
+            alerts.append(("Ausreißer", self._outlier_message(value, self.ewma, std)))
+
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.ewma = value if self.ewma is None else (1 - EWMA_ALPHA) * self.ewma + EWMA_ALPHA * value
+        if in_order:
+            self._push(ts, value)
+            self.last_ts = ts
+        return alerts
+
+    def _push(self, ts, value):
+        self.window(ts)  # abgelaufene Werte entfernen, damit die Warteschlangen klein bleiben
+        while self.lows and self.lows[-1][1] >= value:
+            self.lows.pop()
+        self.lows.append((ts, value))
+        while self.highs and self.highs[-1][1] <= value:
+            self.highs.pop()
+        self.highs.append((ts, value))
+
+    def update_many(self, ts, values):
+        """Wie update() für alle Werte nacheinander; gibt [(Index, Art, Meldung)] zurück."""
+        import pandas as pd
+
+        rule = self.rule
+        count = len(values)
+        if not count:
+            return []
+        alerts = []
+        if rule["low"] is not None:
+            alerts += [(i, "niedrig", self._message(values[i], f"unter {rule['low']:g}"))
+                       for i in np.flatnonzero(values < rule["low"])]
+        if rule["high"] is not None:
+            alerts += [(i, "hoch", self._message(values[i], f"über {rule['high']:g}"))
+                       for i in np.flatnonzero(values > rule["high"])]
+
+        # Zeitfenster: nur Werte, die nicht vor dem neuesten bisherigen liegen
+        seen = np.maximum.accumulate(np.concatenate(([ts[0] if self.last_ts is None else self.last_ts], ts)))
+        in_order = ts >= seen[:-1]
+        context = sorted(set(self.lows) | set(self.highs))
+        all_ts = np.concatenate((np.array([t for t, _ in context], dtype=np.int64), ts[in_order]))
+        all_values = np.concatenate((np.array([v for _, v in context], dtype=float), values[in_order]))
+        if rule["jump"] is not None:
+            ordered = np.flatnonzero(in_order)
+            right = len(context) + np.arange(len(ordered))
+            left = np.searchsorted(all_ts, ts[ordered] - rule["window"], side="left")
+            has_window = left < right
+            ordered, left, right = ordered[has_window], left[has_window], right[has_window]
+            lows, highs = _range_extremes(all_values, left, right)
+            jumps = (values[ordered] < lows - rule["jump"]) | (values[ordered] > highs + rule["jump"])
+            alerts += [(i, "Sprung", self._jump_message(values[i], lo, hi))
+                       for i, lo, hi in zip(ordered[jumps], lows[jumps], highs[jumps])]
+
+        # Welford-Stand und EWMA vor jedem Wert
+        center = self.mean if self.n else values[0]
+        deviations = values - center
+        sums = np.concatenate(([0.0], np.cumsum(deviations)))
+        squares = np.concatenate(([0.0], np.cumsum(deviations * deviations)))
+        n = self.n + np.arange(count + 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = center + (self.n * (self.mean - center) + sums) / n
+            m2 = self.m2 + self.n * (self.mean - center) ** 2 + squares - n * (means - center) ** 2
+            stds = np.where(n > 1, np.sqrt(np.maximum(m2, 0.0) / (n - 1)), 0.0)
+        start = [] if self.ewma is None else [self.ewma]
+        ewma = pd.Series(np.concatenate((start, values))).ewm(alpha=EWMA_ALPHA, adjust=False).mean().to_numpy()
+        before = np.concatenate(([np.nan], ewma))[-count - 1:-1]
+        with np.errstate(invalid="ignore"):
+            outliers = np.flatnonzero((n[:-1] >= MIN_SAMPLES) & (stds[:-1] > 0)
+                                      & (np.abs(values - before) > Z_SCORE * stds[:-1]))
+        alerts += [(i, "Ausreißer", self._outlier_message(values[i], before[i], stds[i])) for i in outliers]
+
+        self.n += count
+        self.mean = float(means[-1])
+        self.m2 = float(m2[-1])
+        self.ewma = float(ewma[-1])
+        if in_order.any():
+            self.last_ts = int(all_ts[-1])
+            self.lows.clear()
+            self.highs.clear()
+            recent = all_ts >= self.last_ts - rule["window"]
+            for t, v in zip(all_ts[recent].tolist(), all_values[recent].tolist()):
+                self._push(t, v)
+        order = ("niedrig", "hoch", "Sprung", "Ausreißer")
+        return sorted(alerts, key=lambda a: (a[0], order.index(a[1])))
+
+    def _message(self, value, text):
+        return f"{self.rule['label']} {value:.1f} {self.rule['unit']} {text}"
+
+    def _jump_message(self, value, low, high):
+        return self._message(value, f"springt gegenüber {low:.1f}-{high:.1f} im Zeitfenster")
+
+    def _outlier_message(self, value, expected, std):
+        return self._message(value, f"ungewöhnlich (erwartet {expected:.1f} ± {std:.1f})")
+
+
+def _range_extremes(values, left, right):
+    """Minimum und Maximum von values[left:right] für viele Bereiche (Sparse Table, O(n log n))."""
+    lengths = right - left
+    levels = np.zeros(len(lengths), dtype=np.int64)
+    if len(lengths):
+        levels = np.frexp(lengths)[1] - 1  # größtes k mit 2**k <= Länge
+    lows, highs = [values], [values]
+    for k in range(1, int(levels.max()) + 1 if len(levels) else 1):
+        half = 1 << (k - 1)
+        lows.append(np.minimum(lows[-1][:-half], lows[-1][half:]))
+        highs.append(np.maximum(highs[-1][:-half], highs[-1][half:]))
+    low = np.empty(len(lengths))
+    high = np.empty(len(lengths))
+    for k in np.unique(levels):
+        mask = levels == k
+        a, b = left[mask], right[mask] - (1 << int(k))
+        low[mask] = np.minimum(lows[k][a], lows[k][b])
+        high[mask] = np.maximum(highs[k][a], highs[k][b])
+    return low, high
+
+
+def load_states(conn=None):
+    """Zustand je Messwert und die zuletzt geprüfte Eintrags-id."""
+    conn = conn or database.get_connection()
+    saved = {metric: (last_id, state) for metric, last_id, state in
+             conn.execute("SELECT metric, last_id, state FROM alert_state")}
+    last_id = min((saved[m][0] if m in saved else 0) for m in METRICS)
+    return {m: MetricState(m, json.loads(saved[m][1]) if m in saved else None) for m in METRICS}, last_id
+
+
+def _check_rows(states, rows):
+    """Prüft Zeilen (id, ts, weight, blood_sugar, sleep_hours); gibt Zeilen für die Tabelle alert zurück."""
+    alerts = []
+    if len(rows) < VECTOR_MIN_ROWS:
+        for entry_id, ts, *values in rows:
+            for metric, value in zip(METRICS, values):
+                if value is not None:
+                    alerts += [(entry_id, ts, metric, kind, value, message)
+                               for kind, message in states[metric].update(ts, value)]
+        return alerts
+    data = np.array(rows, dtype=float).reshape(-1, 2 + len(METRICS))
+    ids = data[:, 0].astype(np.int64)
+    ts = data[:, 1].astype(np.int64)
+    for column, metric in enumerate(METRICS, start=2):
+        present = np.flatnonzero(~np.isnan(data[:, column]))
+        if not len(present):
+            continue  # z.B. Blöcke nur mit Blutzucker vom Messgerät
+        values = data[present, column]
+        for i, kind, message in states[metric].update_many(ts[present], values):
+            row = present[i]
+            alerts.append((int(ids[row]), int(ts[row]), metric, kind, float(values[i]), message))
+    alerts.sort(key=lambda a: (a[0], METRICS.index(a[2])))  # Reihenfolge wie Zeile für Zeile
+    return alerts
+
+
+@timed("alerts.evaluate", rows=lambda r: r["rows"])
+def evaluate(progress=None, chunk_size=CHUNK_SIZE):
+    """Prüft alle noch nicht geprüften Einträge; gibt rows und alerts (neue Warnungen) zurück.
+
+    Jeder Block läuft in einer Transaktion mit den neuen Warnungen und dem
+    Zustand, ein Abbruch über progress verliert also nichts.
+    """
+    rows = alerts = 0
+    with _lock:
+        while True:
+            with database.transaction() as conn:
+                conn.execute("BEGIN IMMEDIATE")  # Zustand lesen und schreiben ohne andere Prozesse dazwischen
+                states, last_id = load_states(conn)
+                chunk = conn.execute(ROWS_SQL, (last_id, chunk_size)).fetchall()
+                if chunk:
+                    new = _check_rows(states, [row[:-1] for row in chunk if row[-1] == 1])
+                    conn.executemany(INSERT_SQL, new)
+                    conn.executemany(SAVE_STATE_SQL, [(metric, chunk[-1][0], json.dumps(state.to_dict()))
+                                                      for metric, state in states.items()])
+            if not chunk:
+                break
+            rows += len(chunk)
+            alerts += len(new)
+            if progress:
+                progress(rows, -1.0)
+            if len(chunk) < chunk_size:
+                break
+    return {"rows": rows, "alerts": alerts}
+
+
+def reset():
+    """Verwirft Warnungen und Zustand; der nächste evaluate() prüft die ganze Historie."""
+    with _lock, database.transaction() as conn:
+        conn.execute("DELETE FROM alert")
+        conn.execute("DELETE FROM alert_state")
+
+
+def current_stats():
+    """Laufende Statistik je Messwert als Liste von Dicts (für die Anzeige)."""
+    states, _ = load_states()
+    stats = []
+    for metric, state in states.items():
+        extremes = state.window(state.last_ts) if state.last_ts is not None else None
+        stats.append({"metric": metric, "label": state.rule["label"], "unit": state.rule["unit"],
+                      "n": state.n, "mean": state.mean if state.n else None, "std": state.std if state.n > 1 else None,
+                      "ewma": state.ewma, "window_days": state.rule["window"] / DAY,
+                      "window_min": extremes[0] if extremes else None,
+                      "window_max": extremes[1] if extremes else None})
+    return stats
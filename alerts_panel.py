@@ -0,0 +1,56 @@
+from PySide6.QtWidgets import QLabel, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget
+
+import alerts
+from database import ALERT_LIMIT, get_alerts
+
+
+def _number(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+class AlertsPanel(QWidget):
+    """Fenster mit den laufenden Statistiken je Messwert und den neuesten Warnungen."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Warnungen")
+        self.setStyleSheet("background-color: #2b2b2b; color: white;")
+        self.resize(800, 600)
+
+        self.stats_table = QTableWidget(0, 8)
+        self.stats_table.setHorizontalHeaderLabels(
+            ["Messwert", "Anzahl", "Ø", "σ", "EWMA", "Fenster", "Min", "Max"])
+        self.alerts_table = QTableWidget(0, 4)
+        self.alerts_table.setHorizontalHeaderLabels(["Zeit", "Messwert", "Art", "Meldung"])
+        self.alerts_table.horizontalHeader().setStretchLastSection(True)
+        for table in (self.stats_table, self.alerts_table):
+            table.setStyleSheet("background-color: #3c3f41; color: white;")
+            table.verticalHeader().setVisible(False)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Laufende Statistik (Min/Max im Zeitfenster bis zum letzten Wert):"))
+        layout.addWidget(self.stats_table)
+        layout.addWidget(QLabel(f"Neueste Warnungen (höchstens {ALERT_LIMIT}):"))
+        layout.addWidget(self.alerts_table, 1)
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        self.refresh()
+        super().showEvent(event)
+
+    def refresh(self):
+        stats = alerts.current_stats()
+        self.stats_table.setRowCount(len(stats))
+        for row, s in enumerate(stats):
+            values = (f"{s['label']} ({s['unit']})", str(s["n"]), _number(s["mean"]), _number(s["std"]),
+                      _number(s["ewma"]), f"{s['window_days']:g} d", _number(s["window_min"]),
+                      _number(s["window_max"]))
+            for col, value in enumerate(values):
+                self.stats_table.setItem(row, col, QTableWidgetItem(value))
+
+        labels = {metric: rule["label"] for metric, rule in alerts.RULES.items()}
+        rows = get_alerts()
+        self.alerts_table.setRowCount(len(rows))
+        for row, (_, _, timestamp, metric, kind, _, message) in enumerate(rows):
+            for col, value in enumerate((timestamp, labels.get(metric, metric), kind, message)):
+                self.alerts_table.setItem(row, col, QTableWidgetItem(value))
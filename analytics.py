@@ -0,0 +1,167 @@
+import numpy as np
+
+import database
+from database import iter_snapshot_rows
+from perf import timed
+
+MOODS = ("Gut", "Mittel", "Schlecht")
+# Zielbereich für Blutzucker in mg/dL
+GLUCOSE_LOW = 70.0
+GLUCOSE_HIGH = 180.0
+MINUTES_PER_DAY = 1440
+
+
+class Snapshot:
+    """Spaltenweise Momentaufnahme der Einträge als NumPy-Arrays.
+
+    t sind Minuten seit 1970-01-01 (Ortszeit, int64), die Messwerte float64
+    mit NaN für fehlende Werte, mood ein Index in MOODS (-1 = unbekannt).
+    """
+
+    def __init__(self, t, weight, sugar, sleep, mood):
+        self.t = t
+        self.weight = weight
+        self.sugar = sugar
+        self.sleep = sleep
+        self.mood = mood
+
+    def __len__(self):
+        return len(self.t)
+
+    @property
+    def days(self):
+        """Zeit als Tage seit 1970-01-01 (entspricht Matplotlib-Datumszahlen)."""
+        return self.t / MINUTES_PER_DAY
+
+
+def columns_from_rows(rows):
+    """Zeilen (ts, weight, blood_sugar, sleep_hours, mood) aus SNAPSHOT_SQL als Spalten-Arrays."""
+    # Alle Spalten sind Zahlen: eine Umwandlung für den ganzen Block, None wird zu NaN
+    values = np.array(rows, dtype=float).reshape(-1, 5)
+    return (
+        values[:, 0].astype(np.int64) // 60,
+        values[:, 1].copy(), values[:, 2].copy(), values[:, 3].copy(),
+        mood_codes(values[:, 4]),
+    )
+
+
+def mood_codes(codes):
+    """Befinden-Codes aus der Datenbank als Index in MOODS (-1 = unbekannt oder leer)."""
+    # Codes 0..2 entsprechen MOODS (database.MOOD_CODES), alles andere ist unbekannt
+    codes = np.asarray(codes, dtype=float)  # None wird zu NaN
+    valid = (codes >= 0) & (codes < len(MOODS))
+    return np.where(valid, codes, -1).astype(np.int8)
+
+
+def _load_from_sql(start, end):
+    parts = [columns_from_rows(rows) for rows in iter_snapshot_rows(start, end)]
+    if not parts:
+        empty = np.array([], dtype=float)
+        return Snapshot(np.array([], dtype=np.int64), empty, empty, empty, np.array([], dtype=np.int8))
+    return Snapshot(*(np.concatenate(cols) for cols in zip(*parts)))
+
+
+@timed("analytics.load_snapshot", rows=len)
+def load_snapshot(start=None, end=None):
+    """Zeit, Gewicht, Zucker, Schlaf und Befinden als Arrays.
+
+    Kommt aus dem Spalten-Cache (column_cache) und nur ohne Datei oder bei
+    Dateifehlern direkt aus SQLite. Die Arrays können schreibgeschützte
+    Memmaps sein.
+    """
+    if database.DB_FILE != ":memory:":
+        import column_cache
+
+        try:
+            return column_cache.get_cache().snapshot(start, end)
+        except OSError:
+            pass
+    return _load_from_sql(start, end)
+
+
+def bmi(weight, height_cm):
+    if not height_cm or height_cm <= 0:
+        return np.full(len(weight), np.nan)
+    return weight / (height_cm / 100.0) ** 2
+
+
+def rolling_mean(t, values, days):
+    """Gleitender Mittelwert über die letzten days Tage je Messzeitpunkt (NaN werden ignoriert)."""
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    first = np.searchsorted(t, t - days * MINUTES_PER_DAY, side="right")
+    last = np.arange(1, len(t) + 1)
+    n = counts[last] - counts[first]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, (sums[last] - sums[first]) / n, np.nan)
+
+
+def linear_trend(t, values):
+    """Lineare Regression; gibt (Steigung pro Tag, Achsenabschnitt) oder None zurück."""
+    valid = ~np.isnan(values)
+    if valid.sum() < 2:
+        return None
+    x = t[valid] / MINUTES_PER_DAY
+    if x[-1] == x[0]:
+        return None
+    slope, intercept = np.polyfit(x - x[0], values[valid], 1)
+    return slope, intercept
+
+
+def glucose_variability(sugar, low=GLUCOSE_LOW, high=GLUCOSE_HIGH):
+    values = sugar[~np.isnan(sugar)]
+    if not len(values):
+        return None
+    mean = values.mean()
+    sd = values.std(ddof=1) if len(values) > 1 else 0.0
+    return {
+        "mean": mean,
+        "sd": sd,
+        "cv": sd / mean * 100 if mean else np.nan,
+        "time_in_range": np.mean((values >= low) & (values <= high)) * 100,
+        "time_below": np.mean(values < low) * 100,
+        "time_above": np.mean(values > high) * 100,
+    }
+
+
+def nanmean(values):
+    values = values[~np.isnan(values)]
+    return values.mean() if len(values) else None
+
+
+def summarize(snapshot, height_cm=0, rolling_days=7):
+    """Kennzahlen für Dialoge und Berichte aus einer Snapshot."""
+    result = {"count": len(snapshot)}
+    if not len(snapshot):
+        return result
+    weight_trend = linear_trend(snapshot.t, snapshot.weight)
+    result.update({
+        "weight_avg": nanmean(snapshot.weight),
+        "weight_rolling": rolling_mean(snapshot.t, snapshot.weight, rolling_days)[-1],
+        "weight_trend_per_week": weight_trend[0] * 7 if weight_trend else None,
+        "bmi_avg": nanmean(bmi(snapshot.weight, height_cm)),
+        "glucose": glucose_variability(snapshot.sugar),
+        "sleep_avg": nanmean(snapshot.sleep),
+        "sleep_rolling": rolling_mean(snapshot.t, snapshot.sleep, rolling_days)[-1],
+    })
+    return result
+
+
+def summary_lines(summary, rolling_days=7):
+    """Formatiert summarize() als Textzeilen (Dialog und PDF)."""
+    lines = []
+    if summary.get("weight_rolling") is not None and not np.isnan(summary["weight_rolling"]):
+        lines.append(f"Gewicht Ø {rolling_days} Tage: {summary['weight_rolling']:.1f} kg")
+    if summary.get("weight_trend_per_week") is not None:
+        lines.append(f"Gewichtstrend: {summary['weight_trend_per_week']:+.2f} kg/Woche")
+    if summary.get("bmi_avg") is not None:
+        lines.append(f"BMI Ø: {summary['bmi_avg']:.1f}")
+    glucose = summary.get("glucose")
+    if glucose:
+        lines.append(f"Zucker: SD {glucose['sd']:.1f} mg/dL, CV {glucose['cv']:.1f} %")
+        lines.append(f"Im Zielbereich ({GLUCOSE_LOW:.0f}-{GLUCOSE_HIGH:.0f}): {glucose['time_in_range']:.0f} %"
+                     f" (darunter {glucose['time_below']:.0f} %, darüber {glucose['time_above']:.0f} %)")
+    if summary.get("sleep_rolling") is not None and not np.isnan(summary["sleep_rolling"]):
+        lines.append(f"Schlaf Ø {rolling_days} Tage: {summary['sleep_rolling']:.1f} h")
+    return lines
@@ -0,0 +1,230 @@
+"""Sicherungen der laufenden Datenbank und geprüfte Wiederherstellung.
+
+create_backup() kopiert die Datenbank mit der Backup-API von SQLite
+(Connection.backup) in Schritten von BACKUP_STEP_PAGES Seiten über eine
+eigene Verbindung, die dabei eine Lesetransaktion offen hält. Im WAL-Modus
+blockiert das weder die GUI noch andere Schreiber, und die Sicherung zeigt
+den Stand zu Beginn. Die Kopie wird mit PRAGMA quick_check geprüft, optional
+mit gzip komprimiert und erst vollständig unter ihrem Namen abgelegt:
+
+    health_data.db.backups/health_data-20250101-080000.db.gz
+
+Pro Datenbank bleiben die neuesten keep Sicherungen erhalten.
+
+restore_backup() entpackt eine Sicherung neben die Datenbank, prüft sie mit
+PRAGMA integrity_check und auf ein bekanntes Schema, schließt alle
+Verbindungen und tauscht die Datei dann aus. Die bisherige Datei bleibt
+als health_data.db.bak liegen. Ältere Sicherungen werden danach wie beim
+Start migriert. Andere Programme (z.B. ingest.py) dürfen die Datenbank
+dabei nicht geöffnet haben.
+"""
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+from datetime import datetime
+
+import column_cache
+import database
+from perf import timed
+
+# Seiten pro Backup-Schritt (bei 4 KB-Seiten 16 MB) und Pause dazwischen (Sekunden)
+BACKUP_STEP_PAGES = 4096
+BACKUP_STEP_SLEEP = 0.01
+DEFAULT_KEEP = 7
+COPY_CHUNK_SIZE = 1024 * 1024
+# Stufe 1 ist etwa dreimal so schnell wie 6 bei ca. 8 % größeren Dateien
+GZIP_LEVEL = 1
+# Nach so vielen SQLite-Instruktionen wird während der Prüfung der Fortschritt gemeldet
+CHECK_PROGRESS_STEPS = 1000000
+TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+class BackupError(ValueError):
+    """Sicherung unbrauchbar oder Wiederherstellung nicht möglich."""
+
+
+def backup_dir(db_file=None):
+    return (db_file or database.DB_FILE) + ".backups"
+
+
+def _stem(db_file):
+    return os.path.splitext(os.path.basename(db_file))[0]
+
+
+def list_backups(directory=None, db_file=None):
+    """Sicherungen der Datenbank im Verzeichnis als (Zeitpunkt, Pfad), älteste zuerst."""
+    db_file = db_file or database.DB_FILE
+    directory = directory or backup_dir(db_file)
+    pattern = re.compile(re.escape(_stem(db_file)) + r"-(\d{8}-\d{6})(?:\.db|\.db\.gz)")
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    backups = []
+    for name in names:
+        match = pattern.fullmatch(name)
+        if match:
+            backups.append((datetime.strptime(match.group(1), TIME_FORMAT), os.path.join(directory, name)))
+    return sorted(backups)
+
+
+def rotate(directory=None, keep=DEFAULT_KEEP, db_file=None):
+    """Löscht alle bis auf die neuesten keep Sicherungen; gibt die gelöschten Pfade zurück."""
+    removed = [path for _, path in list_backups(directory, db_file)[:-keep]] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@timed("backup.create", rows=lambda r: r["pages"])
+def create_backup(directory=None, keep=DEFAULT_KEEP, compress=True, progress=None):
+    """Sichert DB_FILE in directory; gibt path, pages, bytes und removed (rotierte Dateien) zurück.
+
+    progress(kopierte Seiten bzw. Bytes, Anteil) darf zum Abbrechen eine
+    Ausnahme auslösen; angefangene Dateien werden dann entfernt.
+    """
+    directory = directory or backup_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = f"{_stem(database.DB_FILE)}-{datetime.now().strftime(TIME_FORMAT)}"
+    path = os.path.join(directory, name + (".db.gz" if compress else ".db"))
+    tmp = os.path.join(directory, name + ".db.tmp")
+    pages = 0
+
+    def step(status, remaining, total):
+        nonlocal pages
+        pages = total
+        if progress:
+            progress(total - remaining, (total - remaining) / total / (2 if compress else 1))
+
+    source = database.connect()
+    target = sqlite3.connect(tmp)
+    try:
+        # Eine Lesetransaktion über alle Schritte: jeder Schritt sieht denselben Stand, die Kopie
+        # beginnt bei Schreibzugriffen anderer Verbindungen nicht von vorn (WAL: Schreiber warten nicht)
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages=BACKUP_STEP_PAGES, progress=step, sleep=BACKUP_STEP_SLEEP)
+        # Die Sicherung soll als einzelne Datei ohne -wal/-shm lesbar sein
+        target.execute("PRAGMA journal_mode=DELETE")
+        if target.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+            raise BackupError("Kopie ist beschädigt")
+        target.close()
+        if compress:
+            size = os.path.getsize(tmp)
+            with open(tmp, "rb") as src, gzip.open(tmp + ".gz", "wb", compresslevel=GZIP_LEVEL) as dst:
+                done = 0
+                while chunk := src.read(COPY_CHUNK_SIZE):
+                    dst.write(chunk)
+                    done += len(chunk)
+                    if progress:
+                        progress(done, 0.5 + done / size / 2)
+            os.remove(tmp)
+            tmp += ".gz"
+        os.replace(tmp, path)
+    except BaseException:
+        target.close()
+        _remove(tmp)
+        _remove(tmp + ".gz")
+        raise
+    finally:
+        source.close()
+    return {"path": path, "pages": pages, "bytes": os.path.getsize(path),
+            "removed": len(rotate(directory, keep))}
+
+
+def _check(path, progress=None):
+    """Prüft eine entpackte Sicherung; wirft BackupError mit dem Grund."""
+    conn = sqlite3.connect(path)
+    error = None
+
+    def handler():
+        nonlocal error
+        try:
+            progress(0, -1.0)
+        except BaseException as e:  # Abbruch: SQLite unterbrechen, Ausnahme danach weiterreichen
+            error = e
+            return 1
+        return 0
+
+    try:
+        if progress:
+            conn.set_progress_handler(handler, CHECK_PROGRESS_STEPS)
+        try:
+            problems = [row[0] for row in conn.execute("PRAGMA integrity_check(10)")]
+        except sqlite3.DatabaseError as e:
+            if error is not None:
+                raise error from None
+            raise BackupError(f"Keine lesbare SQLite-Datenbank: {e}") from None
+        if problems != ["ok"]:
+            raise BackupError("Sicherung ist beschädigt:\n" + "\n".join(problems))
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > database.SCHEMA_VERSION:
+            raise BackupError(f"Sicherung hat Schema-Version {version}, dieses Programm kennt nur "
+                              f"bis {database.SCHEMA_VERSION}")
+        table = "entry" if version else "health_entry"
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+            raise BackupError(f"Sicherung enthält keine Tabelle {table}")
+    finally:
+        conn.close()
+
+
+@timed("backup.prepare_restore")
+def prepare_restore(path, progress=None):
+    """Entpackt und prüft eine Sicherung neben DB_FILE; gibt den Pfad der geprüften Datei zurück.
+
+    Läuft im Hintergrund; die eigentliche Wiederherstellung (swap_in) ist
+    danach nur noch ein Umbenennen.
+    """
+    tmp = database.DB_FILE + ".restore"
+    try:
+        if path.endswith(".gz"):
+            with gzip.open(path, "rb") as src, open(tmp, "wb") as dst:
+                while chunk := src.read(COPY_CHUNK_SIZE):
+                    dst.write(chunk)
+                    if progress:
+                        progress(dst.tell(), -1.0)
+        else:
+            shutil.copyfile(path, tmp)
+        _check(tmp, progress)
+    except (OSError, EOFError) as e:
+        _remove(tmp)
+        raise BackupError(f"Sicherung nicht lesbar: {e}") from None
+    except BaseException:
+        _remove(tmp)
+        raise
+    return tmp
+
+
+@timed("backup.swap_in")
+def swap_in(tmp):
+    """Ersetzt DB_FILE durch die mit prepare_restore() geprüfte Datei.
+
+    Alle Verbindungen dieses Prozesses werden geschlossen; Hintergrund-
+    aufgaben und die Messwert-Annahme müssen vorher beendet sein.
+    """
+    db_file = database.DB_FILE
+    database.forget_database()
+    if os.path.exists(db_file + "-wal") or os.path.exists(db_file + "-shm"):
+        # Nach dem Schließen der letzten Verbindung räumt SQLite beide Dateien weg
+        _remove(tmp)
+        raise BackupError("Die Datenbank ist noch in einem anderen Programm geöffnet")
+    if os.path.exists(db_file):
+        os.replace(db_file, db_file + ".bak")
+    os.replace(tmp, db_file)
+    column_cache.get_cache(db_file).invalidate()
+    database.init_db()  # ältere Sicherungen migrieren
+
+
+def restore_backup(path, progress=None):
+    """Prüft die Sicherung und stellt sie wieder her (für die Kommandozeile)."""
+    swap_in(prepare_restore(path, progress))
+    return {"restored": path, "previous": database.DB_FILE + ".bak"}
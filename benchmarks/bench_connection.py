@@ -0,0 +1,102 @@
+"""Vergleicht die alte Verbindung-pro-Aufruf mit dem Verbindungs-Pool.
+
+Aufruf aus dem Projektverzeichnis:
+    python benchmarks/bench_connection.py --inserts 2000 --reads 200
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+ENTRY = {
+    "timestamp": "2025-01-01 08:00",
+    "weight": 80.5,
+    "blood_sugar": 105.0,
+    "sleep_hours": 7.5,
+    "mood": "Gut",
+    "notes": "",
+}
+
+
+LEGACY_INSERT_SQL = '''
+    INSERT INTO health_entry (timestamp, weight, blood_sugar, sleep_hours, mood, notes)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
+def entries():
+    """ENTRY mit fortlaufenden Zeitpunkten (gleiche Zeitpunkte wären Upserts derselben Zeile)."""
+    minute = 0
+    while True:
+        yield dict(ENTRY, timestamp=f"2025-01-{1 + minute // 1440:02d} {minute // 60 % 24:02d}:{minute % 60:02d}")
+        minute += 1
+
+
+# Nachbau der ursprünglichen Funktionen (neue Verbindung pro Aufruf)
+def legacy_insert_entry(path, entry):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute(LEGACY_INSERT_SQL, (
+        entry['timestamp'], entry['weight'], entry['blood_sugar'],
+        entry['sleep_hours'], entry['mood'], entry['notes']
+    ))
+    conn.commit()
+    conn.close()
+
+
+def legacy_get_all_entries(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT * FROM health_entry ORDER BY timestamp").fetchall()
+    conn.close()
+    return rows
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return time.perf_counter() - start
+
+
+def run(inserts, reads):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Alte Variante: Rollback-Journal, Verbindung pro Aufruf
+        legacy_path = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(legacy_path)
+        conn.execute("CREATE TABLE health_entry (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, "
+                     "weight REAL, blood_sugar REAL, sleep_hours REAL, mood TEXT, notes TEXT)")
+        conn.commit()
+        conn.close()
+        legacy_entries = entries()
+        results["legacy_insert"] = timed(lambda: legacy_insert_entry(legacy_path, next(legacy_entries)), inserts)
+        results["legacy_read"] = timed(lambda: legacy_get_all_entries(legacy_path), reads)
+
+        # Neue Variante: langlebige Verbindung mit WAL
+        database.DB_FILE = os.path.join(tmp, "pooled.db")
+        database.init_db()
+        pooled_entries = entries()
+        results["pooled_insert"] = timed(lambda: database.insert_entry(next(pooled_entries)), inserts)
+        results["pooled_read"] = timed(database.get_all_entries, reads)
+        database.close_all_connections()
+
+    print(f"{'Operation':<10} {'alt (ops/s)':>14} {'Pool (ops/s)':>14} {'Faktor':>8}")
+    for op, count in (("insert", inserts), ("read", reads)):
+        legacy = count / results[f"legacy_{op}"]
+        pooled = count / results[f"pooled_{op}"]
+        print(f"{op:<10} {legacy:>14.0f} {pooled:>14.0f} {pooled / legacy:>7.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inserts", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+    run(args.inserts, args.reads)
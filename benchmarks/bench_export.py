@@ -0,0 +1,77 @@
+"""Vergleicht den alten pandas-CSV-Export mit dem blockweisen Export.
+
+Jede Variante läuft in einem eigenen Prozess, damit der Speicher-Peak
+(maxrss) getrennt gemessen wird. Aufruf aus dem Projektverzeichnis:
+    python benchmarks/bench_export.py --rows 1000000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import export  # noqa: E402
+from benchmarks.generate import write_database  # noqa: E402
+
+
+def fill_database(path, rows):
+    write_database(path, rows)
+
+
+def export_pandas(db_path, out_path):
+    import pandas as pd
+    database.DB_FILE = db_path
+    data = database.get_all_entries()
+    df = pd.DataFrame(data, columns=export.EXPORT_HEADERS)
+    df.to_csv(out_path, index=False, encoding='utf-8')
+
+
+def export_streaming(db_path, out_path):
+    database.DB_FILE = db_path
+    export.export_to_csv(out_path)
+
+
+def export_streaming_gzip(db_path, out_path):
+    database.DB_FILE = db_path
+    export.export_to_csv(out_path + ".gz")
+
+
+def measure(func, db_path, out_path, queue):
+    start = time.perf_counter()
+    func(db_path, out_path)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss ist unter Linux in KiB
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def run(rows):
+    variants = (("pandas", export_pandas), ("streaming", export_streaming),
+                ("streaming+gzip", export_streaming_gzip))
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        fill_database(db_path, rows)
+        print(f"{rows} Zeilen")
+        print(f"{'Variante':<16} {'Zeit (s)':>10} {'Peak RSS (MB)':>14}")
+        results = {}
+        for name, func in variants:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=measure, args=(func, db_path, os.path.join(tmp, f"{name}.csv"), queue))
+            proc.start()
+            elapsed, peak = queue.get()
+            proc.join()
+            results[name] = {"seconds": elapsed, "peak_rss_mb": peak}
+            print(f"{name:<16} {elapsed:>10.2f} {peak:>14.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+    run(args.rows)
@@ -0,0 +1,93 @@
+"""Erzeugt reproduzierbare synthetische Gesundheitsdaten (Datenbank und/oder CSV).
+
+Aufruf aus dem Projektverzeichnis:
+    python benchmarks/generate.py --rows 100000 --db bench.db --csv bench.csv
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+START = datetime(2020, 1, 1, 6, 0)
+MOODS = ("Gut", "Mittel", "Schlecht")
+MOOD_WEIGHTS = (0.6, 0.3, 0.1)
+NOTES = (
+    "Frühstück mit Haferflocken", "Spaziergang 30 min", "Pizza am Abend", "Kopfschmerzen",
+    "Joggen 5 km", "Viel Wasser getrunken", "Geburtstagsfeier", "Schlecht geschlafen",
+    "Insulin angepasst", "Radtour", "Stress bei der Arbeit", "Salat zum Mittag",
+)
+MEALS = (7.5, 12.5, 18.5)   # Mahlzeiten (Uhrzeit in Stunden) für die Zuckerkurve
+
+
+def generate_rows(rows, seed=42, interval_minutes=5, start=START):
+    """Liefert rows Tupel (timestamp, weight, blood_sugar, sleep_hours, mood, notes).
+
+    Die Abstände schwanken um interval_minutes (wie ein CGM-Sensor), das
+    Gewicht folgt einem langsamen Trend mit Zufallsdrift, der Blutzucker
+    einer Grundlinie mit Anstiegen nach den Mahlzeiten. Schlaf und
+    Befinden werden einmal pro Tag gewürfelt, Notizen sind selten.
+    """
+    rng = random.Random(seed)
+    t = start
+    weight = 92.0
+    day = None
+    sleep = mood = None
+    for i in range(rows):
+        t += timedelta(minutes=max(1, round(rng.gauss(interval_minutes, 1))))
+        if t.date() != day:
+            day = t.date()
+            sleep = round(min(max(rng.gauss(7.2, 1.0), 3.0), 11.0), 1)
+            mood = rng.choices(MOODS, MOOD_WEIGHTS)[0]
+            # langsame Abnahme mit Schwankungen
+            weight += rng.gauss(-0.02, 0.25)
+        hour = t.hour + t.minute / 60
+        sugar = 90 + rng.gauss(0, 6)
+        for meal in MEALS:
+            dt = hour - meal
+            if 0 <= dt < 3:
+                sugar += 60 * math.exp(-((dt - 0.75) ** 2) / 0.5)
+        notes = rng.choice(NOTES) if rng.random() < 0.02 else ""
+        yield (t.strftime(database.TIMESTAMP_FORMAT), round(weight + rng.gauss(0, 0.2), 1),
+               round(sugar, 1), sleep, mood, notes)
+
+
+def write_database(path, rows, seed=42):
+    old = database.DB_FILE
+    database.DB_FILE = path
+    try:
+        database.init_db()
+        database.insert_entries(generate_rows(rows, seed))
+    finally:
+        database.close_connection()
+        database.DB_FILE = old
+
+
+def write_csv(path, rows, seed=42):
+    """Schreibt die Daten im Format von export_to_csv (inkl. ID-Spalte)."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["ID", "Datum", "Gewicht", "Zucker", "Schlaf", "Befinden", "Notizen"])
+        for i, row in enumerate(generate_rows(rows, seed), start=1):
+            writer.writerow((i,) + row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="Ziel-Datenbank")
+    parser.add_argument("--csv", help="Ziel-CSV-Datei")
+    args = parser.parse_args()
+    if not args.db and not args.csv:
+        parser.error("--db und/oder --csv angeben")
+    if args.db:
+        write_database(args.db, args.rows, args.seed)
+    if args.csv:
+        write_csv(args.csv, args.rows, args.seed)
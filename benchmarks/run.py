@@ -0,0 +1,259 @@
+"""Benchmark-Suite für Datenbank, Import/Export und das Laden in der GUI.
+
+Erzeugt pro Größe eine synthetische Datenbank und CSV (benchmarks/generate.py),
+misst die Pfade und schreibt die Ergebnisse als JSON, die sich zwischen
+Commits vergleichen lassen. Die GUI läuft mit Qt's offscreen-Plattform.
+
+    python benchmarks/run.py --sizes 10000 100000 --output results.json
+    python benchmarks/run.py --sizes 10000 --compare results.json
+    python benchmarks/run.py --sizes 1000000 --skip export_to_pdf
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import backup  # noqa: E402
+import database  # noqa: E402
+import export  # noqa: E402
+import retention  # noqa: E402
+from benchmarks.generate import write_csv, write_database  # noqa: E402
+
+SINGLE_INSERTS = 1000
+ENTRY = {"timestamp": "2030-01-01 08:00", "weight": 80.0, "blood_sugar": 100.0,
+         "sleep_hours": 7.0, "mood": "Gut", "notes": ""}
+
+
+def use_database(path):
+    database.close_all_connections()
+    database.DB_FILE = path
+
+
+def bench_insert_entry(ctx):
+    use_database(ctx.copy_db())
+    for i in range(SINGLE_INSERTS):
+        # Eigener Zeitpunkt je Eintrag, sonst wäre es ein Upsert auf dieselbe Zeile
+        database.insert_entry(dict(ENTRY, timestamp=f"2030-01-01 {i // 60 % 24:02d}:{i % 60:02d}", notes=str(i)))
+    return SINGLE_INSERTS
+
+
+def bench_get_all_entries(ctx):
+    use_database(ctx.db)
+    database.clear_result_cache()
+    return len(database.get_all_entries())
+
+
+def bench_get_all_entries_cached(ctx):
+    """Wiederholtes Lesen unveränderter Daten (Ergebnis-Cache)."""
+    use_database(ctx.db)
+    database.get_all_entries()
+    start = time.perf_counter()
+    rows = len(database.get_all_entries())
+    return rows, time.perf_counter() - start
+
+
+def bench_import_from_csv(ctx):
+    return len(export.import_from_csv(ctx.csv))
+
+
+def bench_import_csv_file(ctx):
+    use_database(ctx.tmp_path("import.db"))
+    database.init_db()
+    return export.import_csv_file(ctx.csv)["rows_imported"]
+
+
+def bench_export_to_csv(ctx):
+    use_database(ctx.db)
+    return export.export_to_csv(ctx.tmp_path("export.csv"))
+
+
+def bench_export_to_pdf(ctx):
+    use_database(ctx.db)
+    return export.export_to_pdf(ctx.tmp_path("export.pdf"), height_cm=180)
+
+
+def bench_export_to_pdf_summary(ctx):
+    use_database(ctx.db)
+    export.export_to_pdf(ctx.tmp_path("summary.pdf"), height_cm=180, summary_only=True)
+    return ctx.rows
+
+
+def bench_compact(ctx):
+    """Alle Einträge zu Stundenwerten verdichten und den Platz freigeben."""
+    use_database(ctx.copy_db())
+    database.init_db()
+    retention.compact("2100-01-01", "hour")
+    retention.reclaim_space()
+    return ctx.rows
+
+
+def bench_backup(ctx):
+    """Online-Sicherung mit gzip (Backup-API in Schritten, quick_check, Komprimieren)."""
+    use_database(ctx.db)
+    directory = os.path.join(ctx.tmp, "backups")
+    shutil.rmtree(directory, ignore_errors=True)
+    backup.create_backup(directory, keep=1)
+    return ctx.rows
+
+
+def bench_restore(ctx):
+    """Komprimierte Sicherung entpacken, mit integrity_check prüfen und eintauschen."""
+    use_database(ctx.db)
+    directory = os.path.join(ctx.tmp, "backups")
+    shutil.rmtree(directory, ignore_errors=True)
+    path = backup.create_backup(directory, keep=1)["path"]
+    use_database(ctx.copy_db())
+    start = time.perf_counter()
+    backup.restore_backup(path)
+    return ctx.rows, time.perf_counter() - start
+
+
+def bench_gui_load_entries(ctx):
+    """HealthTracker.load_entries mit kompletter Historie, bis das Diagramm steht."""
+    from PySide6.QtWidgets import QApplication
+    import main
+
+    app = QApplication.instance() or QApplication([])
+    use_database(ctx.db)
+    main.SETTINGS_FILE = ctx.tmp_path("settings.json")
+    with open(main.SETTINGS_FILE, "w") as f:
+        json.dump({"height_cm": 180, "window_days": 0}, f)
+    window = main.HealthTracker()
+    window.show()
+    app.processEvents()  # init_chart() läuft über einen QTimer
+    _wait_for_load(app, window)
+
+    start = time.perf_counter()
+    window.load_entries()
+    _wait_for_load(app, window)
+    window.canvas.draw()
+    elapsed = time.perf_counter() - start
+    window.close()
+    app.processEvents()
+    return ctx.rows, elapsed
+
+
+def _wait_for_load(app, window):
+    while window.load_task is not None or window.tasks.active:
+        window.tasks.wait(10)
+        app.processEvents()
+
+
+BENCHMARKS = {
+    "insert_entry": bench_insert_entry,
+    "get_all_entries": bench_get_all_entries,
+    "get_all_entries_cached": bench_get_all_entries_cached,
+    "import_from_csv": bench_import_from_csv,
+    "import_csv_file": bench_import_csv_file,
+    "export_to_csv": bench_export_to_csv,
+    "export_to_pdf": bench_export_to_pdf,
+    "export_to_pdf_summary": bench_export_to_pdf_summary,
+    "compact": bench_compact,
+    "backup": bench_backup,
+    "restore": bench_restore,
+    "gui_load_entries": bench_gui_load_entries,
+}
+
+
+class Context:
+    def __init__(self, tmp, rows, seed):
+        self.tmp = tmp
+        self.rows = rows
+        self.db = os.path.join(tmp, f"data_{rows}.db")
+        self.csv = os.path.join(tmp, f"data_{rows}.csv")
+        write_database(self.db, rows, seed)
+        write_csv(self.csv, rows, seed)
+
+    def tmp_path(self, name):
+        path = os.path.join(self.tmp, name)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        return path
+
+    def copy_db(self):
+        database.close_all_connections()
+        path = self.tmp_path("copy.db")
+        shutil.copyfile(self.db, path)
+        return path
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, names, repeat, seed):
+    results = []
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            ctx = Context(tmp, rows, seed)
+            for name in names:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    outcome = BENCHMARKS[name](ctx)
+                    elapsed = time.perf_counter() - start
+                    if isinstance(outcome, tuple):
+                        outcome, elapsed = outcome
+                    timings.append(elapsed)
+                seconds = statistics.median(timings)
+                results.append({"name": name, "rows": rows, "processed": outcome, "seconds": seconds,
+                                "min_seconds": min(timings), "per_second": outcome / seconds if seconds else None})
+                print(f"{name:<24} {rows:>9} {seconds:>10.3f} s", flush=True)
+            database.close_all_connections()
+    return {
+        "commit": git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare(current, baseline):
+    base = {(r["name"], r["rows"]): r["seconds"] for r in baseline["results"]}
+    print(f"\nVergleich mit {baseline.get('commit')}:")
+    print(f"{'Benchmark':<24} {'Zeilen':>9} {'vorher':>10} {'jetzt':>10} {'Faktor':>8}")
+    for r in current["results"]:
+        before = base.get((r["name"], r["rows"]))
+        if before is None:
+            continue
+        print(f"{r['name']:<24} {r['rows']:>9} {before:>10.3f} {r['seconds']:>10.3f} {before / r['seconds']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="nur diese Benchmarks")
+    parser.add_argument("--skip", nargs="+", choices=sorted(BENCHMARKS), default=[])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Ergebnisse als JSON schreiben")
+    parser.add_argument("--compare", help="mit früherem JSON-Ergebnis vergleichen")
+    args = parser.parse_args()
+
+    selected = [n for n in (args.only or BENCHMARKS) if n not in args.skip]
+    report = run(args.sizes, selected, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
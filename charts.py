@@ -0,0 +1,221 @@
+import numpy as np
+
+from analytics import MINUTES_PER_DAY, load_snapshot
+from downsample import downsample
+from perf import timed
+
+# Idealbereich für den BMI
+BMI_IDEAL_MIN = 18.5
+BMI_IDEAL_MAX = 24.9
+
+
+class Series:
+    """Volle Auflösung einer Messreihe (x als Matplotlib-Datumszahl, ohne NaN)."""
+
+    def __init__(self, x, y):
+        y = np.asarray(y, dtype=float)
+        valid = ~np.isnan(y)
+        self.x = np.asarray(x, dtype=float)[valid]
+        self.y = y[valid]
+
+    def insert(self, x, y):
+        if y is None or np.isnan(y):
+            return
+        pos = int(np.searchsorted(self.x, x, side="right"))
+        self.x = np.insert(self.x, pos, x)
+        self.y = np.insert(self.y, pos, y)
+
+    def insert_many(self, x, y):
+        """Fügt mehrere Punkte ein (in einem Schritt statt Punkt für Punkt)."""
+        new = Series(x, y)
+        if not len(new.x):
+            return
+        order = np.argsort(new.x, kind="stable")
+        pos = np.searchsorted(self.x, new.x[order], side="right")
+        self.x = np.insert(self.x, pos, new.x[order])
+        self.y = np.insert(self.y, pos, new.y[order])
+
+
+def to_date_num(timestamp):
+    """Zeitstempel-Text in eine Matplotlib-Datumszahl (Tage seit 1970) umrechnen."""
+    return np.datetime64(timestamp, "m").astype(np.int64) / MINUTES_PER_DAY
+
+
+def parse_rows(rows):
+    """Wandelt Datenbankzeilen in die Reihen (Gewicht, Zucker) für das Diagramm um."""
+    if not rows:
+        return Series([], []), Series([], [])
+    _, ts, weight, sugar = list(zip(*rows))[:4]
+    x = np.array(ts, dtype="datetime64[m]").astype(np.int64) / MINUTES_PER_DAY
+    return Series(x, np.array(weight, dtype=float)), Series(x, np.array(sugar, dtype=float))
+
+
+@timed("chart.load_series")
+def load_series(start=None, end=None, task=None):
+    """Liest die Diagrammdaten spaltenweise; läuft auch außerhalb des GUI-Threads."""
+    snapshot = load_snapshot(start, end)
+    return Series(snapshot.days, snapshot.weight), Series(snapshot.days, snapshot.sugar)
+
+
+class ChartController:
+    """Hält die drei Linien für Gewicht, Zucker und BMI und aktualisiert sie.
+
+    Die Figur wird nur neu aufgebaut, wenn sich die Daten tatsächlich
+    geändert haben oder die Körpergröße neu gesetzt bzw. entfernt wird.
+    Einzelne neue Einträge werden in die bestehenden Reihen eingefügt und
+    mit draw_idle neu gezeichnet.
+
+    Gezeichnet wird nicht jeder Rohwert: beim Zoomen, Verschieben und bei
+    Größenänderungen wird der sichtbare Ausschnitt neu auf etwa einen Punkt
+    pro Pixel (Min/Max je Pixelspalte oder LTTB) reduziert.
+    """
+
+    def __init__(self, fig, canvas, method="minmax"):
+        self.fig = fig
+        self.canvas = canvas
+        self.method = method
+        self.weights = Series([], [])
+        self.sugars = Series([], [])
+        self.height_cm = 0
+        self.axes = None
+        self.weight_line = None
+        self.sugar_line = None
+        self.bmi_line = None
+        self.canvas.mpl_connect("resize_event", lambda event: self.resample())
+
+    def bmi_factor(self):
+        if not self.height_cm or self.height_cm <= 0:
+            return None
+        return 1.0 / (self.height_cm / 100.0) ** 2
+
+    def set_data(self, rows, height_cm):
+        """Übernimmt die Einträge (Datenbankzeilen); gibt True zurück, wenn neu gezeichnet wurde."""
+        return self.set_series(*parse_rows(rows), height_cm)
+
+    def set_series(self, weights, sugars, height_cm):
+        """Übernimmt bereits geparste Reihen (siehe load_series)."""
+        if (self.axes is not None and self._same(weights, self.weights)
+                and self._same(sugars, self.sugars)):
+            return self.set_height(height_cm)
+        self.weights, self.sugars = weights, sugars
+        self.height_cm = height_cm
+        self.rebuild()
+        return True
+
+    @staticmethod
+    def _same(a, b):
+        return np.array_equal(a.x, b.x) and np.array_equal(a.y, b.y)
+
+    def set_height(self, height_cm):
+        if height_cm == self.height_cm:
+            return False
+        had_height = bool(self.height_cm)
+        self.height_cm = height_cm
+        if self.axes is None or had_height != bool(height_cm):
+            # BMI-Diagramm kommt hinzu oder fällt weg
+            self.rebuild()
+        else:
+            self.autoscale()
+        return True
+
+    @timed("chart.append")
+    def append(self, timestamp, weight, sugar):
+        """Fügt einen einzelnen Eintrag an der zeitlich passenden Stelle ein."""
+        if self.axes is None:
+            self.rebuild()
+        x = to_date_num(timestamp)
+        self.weights.insert(x, weight)
+        self.sugars.insert(x, sugar)
+        self.autoscale()
+
+    @timed("chart.append_many")
+    def append_many(self, timestamps, weights, sugars):
+        """Wie append, für viele Einträge auf einmal (z.B. aus dem Ingest-Dienst)."""
+        if self.axes is None:
+            self.rebuild()
+        x = np.array(timestamps, dtype="datetime64[m]").astype(np.int64) / MINUTES_PER_DAY
+        self.weights.insert_many(x, np.array(weights, dtype=float))
+        self.sugars.insert_many(x, np.array(sugars, dtype=float))
+        self.autoscale()
+
+    def plotted(self):
+        """Die drei Linien mit ihren Datenreihen und dem jeweiligen y-Faktor."""
+        lines = [(self.weight_line, self.weights, 1.0), (self.sugar_line, self.sugars, 1.0)]
+        if self.bmi_line is not None:
+            lines.append((self.bmi_line, self.weights, self.bmi_factor()))
+        return lines
+
+    def target_points(self):
+        """Ungefähr ein Punkt pro Pixel der Achsenbreite."""
+        if self.axes is None:
+            return 0
+        width = self.axes[0].get_window_extent().width
+        return max(int(width), 100)
+
+    @timed("chart.resample")
+    def resample(self, ax=None):
+        if self.axes is None:
+            return
+        x_min, x_max = self.axes[0].get_xlim()
+        target = self.target_points()
+        for line, series, factor in self.plotted():
+            xs, ys = downsample(series.x, series.y, x_min, x_max, target, self.method)
+            line.set_data(xs, ys * factor)
+        self.canvas.draw_idle()
+
+    def autoscale(self):
+        """Setzt die Achsengrenzen anhand der vollen Daten, nicht der reduzierten Linien."""
+        xs = [s.x for s in (self.weights, self.sugars) if len(s.x)]
+        for line, series, factor in self.plotted():
+            if len(series.y):
+                lo, hi = series.y.min() * factor, series.y.max() * factor
+                if self.bmi_line is line:
+                    lo, hi = min(lo, BMI_IDEAL_MIN), max(hi, BMI_IDEAL_MAX)
+                margin = (hi - lo) * 0.05 or 1.0
+                line.axes.set_ylim(lo - margin, hi + margin)
+        if xs:
+            x_min = min(x[0] for x in xs)
+            x_max = max(x[-1] for x in xs)
+            if x_min == x_max:
+                x_min, x_max = x_min - 1, x_max + 1
+            # löst über xlim_changed auch resample() aus
+            self.axes[0].set_xlim(x_min, x_max)
+        else:
+            self.resample()
+
+    @timed("chart.rebuild")
+    def rebuild(self):
+        self.fig.clf()  # Alte Plots löschen
+
+        # Subplots erzeugen (3 Zeilen, 1 Spalte)
+        axs = self.fig.subplots(3, 1, sharex=True)
+        self.axes = axs
+        axs[0].xaxis_date()
+
+        # Subplot 1: Gewicht
+        self.weight_line, = axs[0].plot([], [], color='blue', label="Gewicht (kg)")
+        axs[0].set_ylabel("Gewicht (kg)")
+        axs[0].legend()
+        axs[0].grid(True)
+
+        # Subplot 2: Blutzucker
+        self.sugar_line, = axs[1].plot([], [], color='green', label="Zucker (mg/dL)")
+        axs[1].set_ylabel("Zucker (mg/dL)")
+        axs[1].legend()
+        axs[1].grid(True)
+
+        # Subplot 3: BMI (wenn Größe bekannt)
+        self.bmi_line = None
+        if self.height_cm:
+            self.bmi_line, = axs[2].plot([], [], color='orange', linestyle='--', label="BMI")
+            axs[2].axhspan(BMI_IDEAL_MIN, BMI_IDEAL_MAX, color='green', alpha=0.1, label="BMI Idealbereich")
+            axs[2].set_ylabel("BMI")
+            axs[2].grid(True)
+            axs[2].legend()
+
+        axs[2].set_xlabel("Datum")
+
+        axs[0].callbacks.connect("xlim_changed", self.resample)
+        self.autoscale()
+        self.fig.tight_layout()
+        self.resample()
@@ -0,0 +1,270 @@
+"""Kommandozeile ohne Qt: Import, Export und Auswertungen für eine oder viele Datenbanken.
+
+    python cli.py import daten.csv --db health_data.db
+    python cli.py export-csv export.csv.gz --db health_data.db --start 2024-01-01
+    python cli.py export-pdf berichte/{name}.pdf --dir nutzer/ --jobs 8 --height-cm 180
+    python cli.py averages --period week --limit 4 --dir nutzer/
+    python cli.py compact --months 12 --resolution hour --dir nutzer/
+    python cli.py alerts --reset --dir nutzer/
+    python cli.py backup --output sicherungen/{name} --keep 14 --dir nutzer/
+    python cli.py restore health_data.db.backups/health_data-20250101-080000.db.gz --db health_data.db
+
+Mit --dir wird jede passende Datenbank im Verzeichnis in einem eigenen
+Prozess bearbeitet. In Dateinamen steht {name} für den Namen der
+Datenbank ohne Endung, z.B. importe/{name}.csv.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import database
+
+SETTINGS_FILE = "settings.json"
+DB_PATTERN = "*.db"
+
+
+def parse_time(value, end=False):
+    """'YYYY-MM-DD' oder 'YYYY-MM-DD HH:MM'; ein Datum als Ende schließt den ganzen Tag ein."""
+    if value is None:
+        return None
+    if len(value) == 10:
+        return value + (" 23:59" if end else " 00:00")
+    return value
+
+
+def load_settings():
+    try:
+        with open(SETTINGS_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def default_height():
+    return load_settings().get("height_cm", 0)
+
+
+def target_path(template, db_path):
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    return template.format(name=name)
+
+
+def cmd_import(db_path, args):
+    from export import import_csv_file
+    return import_csv_file(target_path(args.csv, db_path), source=args.source, full=args.full)
+
+
+def cmd_export_csv(db_path, args):
+    from export import export_to_csv
+    return {"rows": export_to_csv(target_path(args.output, db_path), args.start, args.end)}
+
+
+def cmd_export_pdf(db_path, args):
+    from export import export_to_pdf
+    rows = export_to_pdf(target_path(args.output, db_path), args.start, args.end,
+                         height_cm=args.height_cm, summary_only=args.summary_only)
+    return {"rows": rows}
+
+
+def cmd_averages(db_path, args):
+    return {"averages": database.get_averages(args.period, args.start, args.end,
+                                              limit=args.limit, newest_first=args.newest_first)}
+
+
+def cmd_compact(db_path, args):
+    from retention import apply_policy
+    return apply_policy(args.months, args.resolution)
+
+
+def cmd_alerts(db_path, args):
+    import alerts
+    if args.reset:
+        alerts.reset()
+    return alerts.evaluate()
+
+
+def cmd_backup(db_path, args):
+    from backup import create_backup
+    return create_backup(args.output and target_path(args.output, db_path), args.keep, not args.no_compress)
+
+
+def cmd_restore(db_path, args):
+    from backup import restore_backup
+    return restore_backup(args.snapshot)
+
+
+COMMANDS = {
+    "import": cmd_import,
+    "export-csv": cmd_export_csv,
+    "export-pdf": cmd_export_pdf,
+    "averages": cmd_averages,
+    "compact": cmd_compact,
+    "alerts": cmd_alerts,
+    "backup": cmd_backup,
+    "restore": cmd_restore,
+}
+
+
+def run_job(db_path, args):
+    """Bearbeitet eine Datenbank; läuft im Hauptprozess oder in einem Worker.
+
+    Gibt ein Dict mit db, ok, seconds und result bzw. error zurück; Fehler
+    werden nicht weitergereicht, damit eine kaputte Datei den Lauf nicht
+    abbricht.
+    """
+    start = time.perf_counter()
+    job = {"db": db_path}
+    try:
+        database.close_all_connections()
+        database.DB_FILE = db_path
+        if args.command != "restore":  # die Datei ist dann evtl. beschädigt; swap_in() migriert danach
+            database.init_db()
+        job["result"] = COMMANDS[args.command](db_path, args)
+        job["ok"] = True
+    except Exception as e:
+        job["ok"] = False
+        job["error"] = f"{type(e).__name__}: {e}"
+        if args.verbose:
+            job["traceback"] = traceback.format_exc()
+    finally:
+        database.close_all_connections()
+    job["seconds"] = time.perf_counter() - start
+    return job
+
+
+def find_databases(args):
+    if args.dir:
+        paths = sorted(glob.glob(os.path.join(args.dir, args.pattern)))
+        if not paths:
+            raise SystemExit(f"Keine Datenbanken ({args.pattern}) in {args.dir}")
+        return paths
+    return args.db or [database.DB_FILE]
+
+
+def run_all(paths, args):
+    """Führt den Befehl für alle Datenbanken aus; bei mehreren parallel in jobs Prozessen."""
+    jobs = min(args.jobs or os.cpu_count() or 1, len(paths))
+    if jobs <= 1:
+        for path in paths:
+            yield run_job(path, args)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_job, path, args) for path in paths]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def print_job(job, out=sys.stdout):
+    if not job["ok"]:
+        print(f"FEHLER {job['db']} ({job['seconds']:.2f} s): {job['error']}", file=out)
+        if "traceback" in job:
+            print(job["traceback"], file=out)
+        return
+    result = job["result"]
+    if "averages" in result:
+        print(f"{job['db']} ({job['seconds']:.2f} s)", file=out)
+        for row in result["averages"]:
+            values = "  ".join("-" if row[key] is None else f"{row[key]:.1f}"
+                               for key in ("weight_avg", "sugar_avg", "sleep_avg"))
+            print(f"  {row['period']}  {row['entries']:>6}  {values}", file=out)
+    else:
+        details = ", ".join(f"{key}={value}" for key, value in result.items())
+        print(f"OK {job['db']} ({job['seconds']:.2f} s): {details}", file=out)
+
+
+def print_summary(results, elapsed, out=sys.stdout):
+    failed = [job for job in results if not job["ok"]]
+    busy = sum(job["seconds"] for job in results)
+    print(f"\n{len(results)} Datenbanken in {elapsed:.2f} s (Summe der Einzelzeiten {busy:.2f} s), "
+          f"{len(failed)} fehlgeschlagen", file=out)
+    for job in failed:
+        print(f"  {job['db']}: {job['error']}", file=out)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    targets = argparse.ArgumentParser(add_help=False)
+    group = targets.add_mutually_exclusive_group()
+    group.add_argument("--db", nargs="+", help=f"Datenbankdatei(en), Standard: {database.DB_FILE}")
+    group.add_argument("--dir", help="alle Datenbanken in diesem Verzeichnis bearbeiten")
+    targets.add_argument("--pattern", default=DB_PATTERN, help=f"Dateimuster für --dir (Standard: {DB_PATTERN})")
+    targets.add_argument("--jobs", type=int, help="Anzahl Prozesse (Standard: Anzahl Kerne)")
+    targets.add_argument("--json", help="Ergebnisse je Datenbank als JSON schreiben")
+    targets.add_argument("--verbose", action="store_true", help="Tracebacks bei Fehlern ausgeben")
+    timerange = argparse.ArgumentParser(add_help=False)
+    timerange.add_argument("--start", help="Beginn, YYYY-MM-DD [HH:MM]")
+    timerange.add_argument("--end", help="Ende, YYYY-MM-DD [HH:MM]")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("import", parents=[targets], help="CSV-Datei importieren")
+    p.add_argument("csv", help="CSV-Datei (mit {name} je Datenbank)")
+    p.add_argument("--source", help="Quelle der Einträge (Standard: Dateiname ohne Endung)")
+    p.add_argument("--full", action="store_true", help="alle Zeilen abgleichen, nicht nur die nach der letzten Marke")
+    p = commands.add_parser("export-csv", parents=[targets, timerange], help="Einträge als CSV exportieren")
+    p.add_argument("output", help="Zieldatei, .gz wird komprimiert (mit {name} je Datenbank)")
+    p = commands.add_parser("export-pdf", parents=[targets, timerange], help="PDF-Bericht schreiben")
+    p.add_argument("output", help="Zieldatei (mit {name} je Datenbank)")
+    p.add_argument("--height-cm", type=float, default=None, help=f"Körpergröße für BMI (Standard: aus {SETTINGS_FILE})")
+    p.add_argument("--summary-only", action="store_true", help="nur Kennzahlen und Diagramme, ohne Eintragsliste")
+    p = commands.add_parser("averages", parents=[targets, timerange], help="Durchschnitte je Tag/Woche/Monat")
+    p.add_argument("--period", choices=sorted(database.PERIODS), default="day")
+    p.add_argument("--limit", type=int)
+    p.add_argument("--newest-first", action="store_true")
+    p = commands.add_parser("compact", parents=[targets], help="alte Einträge verdichten und Platz freigeben")
+    p.add_argument("--months", type=int, help=f"Rohwerte so viele Monate behalten (Standard: aus {SETTINGS_FILE})")
+    p.add_argument("--resolution", choices=("hour", "day"), help="Stunden- oder Tageswerte (Standard: aus "
+                   f"{SETTINGS_FILE}, sonst hour)")
+    p = commands.add_parser("alerts", parents=[targets], help="neue Einträge auf Warnungen prüfen")
+    p.add_argument("--reset", action="store_true", help="Warnungen verwerfen und die ganze Historie neu prüfen")
+    p = commands.add_parser("backup", parents=[targets], help="Sicherung der laufenden Datenbank anlegen")
+    p.add_argument("--output", help="Verzeichnis (mit {name} je Datenbank), Standard: DATENBANK.backups")
+    p.add_argument("--keep", type=int, help=f"so viele Sicherungen behalten (Standard: aus {SETTINGS_FILE}, sonst 7)")
+    p.add_argument("--no-compress", action="store_true", help="nicht mit gzip komprimieren")
+    p = commands.add_parser("restore", parents=[targets], help="Sicherung prüfen und wiederherstellen")
+    p.add_argument("snapshot", help="Sicherungsdatei (.db oder .db.gz)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if hasattr(args, "start"):
+        args.start = parse_time(args.start)
+        args.end = parse_time(args.end, end=True)
+    if getattr(args, "height_cm", 0) is None:
+        args.height_cm = default_height()
+    if args.command == "compact":
+        from retention import DEFAULT_RESOLUTION, policy_from_settings
+        months, resolution = policy_from_settings(load_settings()) or (None, DEFAULT_RESOLUTION)
+        args.months = args.months or months
+        args.resolution = args.resolution or resolution
+        if not args.months:
+            raise SystemExit(f"Keine Aufbewahrungsdauer: --months oder retention_months in {SETTINGS_FILE}")
+    if args.command == "backup" and args.keep is None:
+        from backup import DEFAULT_KEEP
+        args.keep = load_settings().get("backup_keep", DEFAULT_KEEP)
+    paths = find_databases(args)
+    if args.command == "restore" and len(paths) > 1:
+        raise SystemExit("Wiederherstellen nur für eine Datenbank")
+    if len(paths) > 1 and "{name}" not in (getattr(args, "output", None) or getattr(args, "csv", "{name}")):
+        raise SystemExit("Bei mehreren Datenbanken muss der Dateiname {name} enthalten")
+
+    start = time.perf_counter()
+    results = []
+    for job in run_all(paths, args):
+        print_job(job)
+        results.append(job)
+    if len(results) > 1:
+        print_summary(results, time.perf_counter() - start)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    return 0 if all(job["ok"] for job in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import glob
+import json
+import os
+import threading
+
+import numpy as np
+
+import database
+from analytics import Snapshot, columns_from_rows
+from perf import timed
+
+# Spalten der Cache-Datei: Name -> NumPy-Datentyp
+COLUMNS = {
+    "t": np.int64,        # Minuten seit 1970-01-01 (Ortszeit)
+    "weight": np.float64,
+    "sugar": np.float64,
+    "sleep": np.float64,
+    "mood": np.int8,      # Index in analytics.MOODS, -1 = unbekannt
+}
+FORMAT_VERSION = 2
+
+_lock = threading.Lock()
+
+
+def cache_dir(db_file=None):
+    return (db_file or database.DB_FILE) + ".cols"
+
+
+def convert_rows(rows):
+    return dict(zip(COLUMNS, columns_from_rows(rows)))
+
+
+class ColumnCache:
+    """Binärer Spalten-Cache neben der Datenbank, gelesen per numpy.memmap.
+
+    Pro Spalte gibt es eine Datei mit festen Elementgrößen, sortiert nach
+    Zeit. meta.json hält Zeilenzahl, größte id und den Änderungszähler der
+    Datenbank (data_changes), zu dem der Cache passt. Beim Lesen wird
+    abgeglichen: kamen seitdem nur neue Zeilen hinzu, die zeitlich hinten
+    liegen, werden sie angehängt; bei allem anderen (Updates, Löschungen,
+    nachgetragene ältere Einträge, Schreiben anderer Prozesse mit Lücken)
+    wird der Cache neu aufgebaut. Ein Neuaufbau schreibt eine neue
+    Generation von Dateien, damit noch offene Memmaps gültig bleiben.
+    """
+
+    def __init__(self, db_file=None):
+        self.db_file = db_file or database.DB_FILE
+        self.directory = cache_dir(self.db_file)
+        self.meta = None
+        self._maps = None
+
+    def _path(self, generation, column):
+        return os.path.join(self.directory, f"g{generation}_{column}.bin")
+
+    def _meta_path(self):
+        return os.path.join(self.directory, "meta.json")
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path()) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("version") == FORMAT_VERSION else None
+
+    def _write_meta(self, meta):
+        tmp = self._meta_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path())
+        self.meta = meta
+        self._maps = None
+
+    def sync(self):
+        """Bringt den Cache auf den Stand der Datenbank; gibt die Metadaten zurück."""
+        with _lock:
+            changes, rows, max_id = database.get_change_state()
+            meta = self.meta or self._read_meta()
+            generation = (meta or {}).get("generation", 0) + 1
+            if meta and meta.get("invalid"):
+                meta = None
+            if meta and meta["changes"] == changes and meta["rows"] == rows:
+                self.meta = meta
+                return meta
+            if (meta and changes - meta["changes"] == rows - meta["rows"] > 0
+                    and self._append(meta, changes, rows, max_id)):
+                return self.meta
+            self._rebuild(changes, rows, max_id, generation)
+            return self.meta
+
+    def invalidate(self):
+        """Erzwingt beim nächsten sync() einen Neuaufbau, z.B. nach dem Austausch der Datenbankdatei.
+
+        Der Änderungszähler einer anderen Datei kann zufällig zu meta.json
+        passen, daher reicht der Abgleich dort nicht.
+        """
+        with _lock:
+            meta = self.meta or self._read_meta()
+            if meta:
+                self._write_meta(dict(meta, invalid=True))
+
+    @timed("cache.append", rows=int)
+    def _append(self, meta, changes, rows, max_id):
+        """Hängt Zeilen mit id > meta['max_id'] an, falls sie zeitlich hinten liegen."""
+        parts = [convert_rows(chunk) for chunk in database.iter_snapshot_rows_after(meta["max_id"])]
+        if not parts:
+            return False
+        new = {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+        order = np.argsort(new["t"], kind="stable")
+        new = {name: values[order] for name, values in new.items()}
+        if len(new["t"]) != rows - meta["rows"] or (meta["rows"] and new["t"][0] < meta["last_t"]):
+            return False
+        for name, dtype in COLUMNS.items():
+            with open(self._path(meta["generation"], name), "r+b") as f:
+                f.seek(meta["rows"] * np.dtype(dtype).itemsize)
+                f.truncate()  # Reste eines abgebrochenen Anhängens entfernen
+                f.write(new[name].astype(dtype).tobytes())
+        self._write_meta(dict(meta, rows=rows, changes=changes, max_id=max_id, last_t=int(new["t"][-1])))
+        return len(new["t"])
+
+    @timed("cache.rebuild", rows=lambda meta: meta["rows"])
+    def _rebuild(self, changes, rows, max_id, generation):
+        os.makedirs(self.directory, exist_ok=True)
+        files = {name: open(self._path(generation, name), "wb") for name in COLUMNS}
+        count = 0
+        last_t = None
+        try:
+            for chunk in database.iter_snapshot_rows():
+                columns = convert_rows(chunk)
+                for name, dtype in COLUMNS.items():
+                    files[name].write(columns[name].astype(dtype).tobytes())
+                count += len(chunk)
+                last_t = int(columns["t"][-1])
+        finally:
+            for f in files.values():
+                f.close()
+        self._write_meta({"version": FORMAT_VERSION, "generation": generation, "rows": count,
+                          "changes": changes, "max_id": max_id, "last_t": last_t})
+        self._remove_old_generations(generation)
+        return self.meta
+
+    def _remove_old_generations(self, generation):
+        for path in glob.glob(os.path.join(self.directory, "g*_*.bin")):
+            if not os.path.basename(path).startswith(f"g{generation}_"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # unter Windows evtl. noch gemappt; beim nächsten Mal
+
+    def columns(self):
+        """Alle Spalten als schreibgeschützte Memmaps (nach sync())."""
+        meta = self.meta
+        if self._maps is None:
+            if not meta["rows"]:
+                self._maps = {name: np.array([], dtype=dtype) for name, dtype in COLUMNS.items()}
+            else:
+                self._maps = {name: np.memmap(self._path(meta["generation"], name), dtype=dtype,
+                                              mode="r", shape=(meta["rows"],))
+                              for name, dtype in COLUMNS.items()}
+        return self._maps
+
+    @timed("cache.load", rows=len)
+    def snapshot(self, start=None, end=None):
+        """Snapshot für den Zeitbereich als Ausschnitt der Memmaps (ohne Kopie)."""
+        self.sync()
+        cols = self.columns()
+        lo, hi = 0, len(cols["t"])
+        if start is not None:
+            lo = int(np.searchsorted(cols["t"], _minutes(start), side="left"))
+        if end is not None:
+            hi = int(np.searchsorted(cols["t"], _minutes(end), side="right"))
+        return Snapshot(cols["t"][lo:hi], cols["weight"][lo:hi], cols["sugar"][lo:hi],
+                        cols["sleep"][lo:hi], cols["mood"][lo:hi])
+
+
+def _minutes(value):
+    return database.to_epoch(value) // 60
+
+
+_caches = {}
+
+
+def get_cache(db_file=None):
+    """Der Cache zur aktuellen (oder angegebenen) Datenbankdatei."""
+    db_file = db_file or database.DB_FILE
+    with _lock:
+        cache = _caches.get(db_file)
+        if cache is None:
+            cache = _caches[db_file] = ColumnCache(db_file)
+    return cache
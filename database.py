@@ -1,46 +1,938 @@
+import calendar
+import functools
 import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 
+from perf import timed
+
 DB_FILE = "health_data.db"
 
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS health_entry (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            weight REAL,
-            blood_sugar REAL,
-            sleep_hours REAL,
-            mood TEXT,
-            notes TEXT
-        )
-    ''')
-    conn.commit()
+# Einstellungen für die dauerhaft offenen Verbindungen
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",   # im WAL-Modus sicher, spart fsync pro Commit
+    "PRAGMA cache_size=-16000",    # ca. 16 MB Seitencache
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+# Anzahl vorbereiteter Statements, die pro Verbindung wiederverwendet werden
+STATEMENT_CACHE_SIZE = 128
+# Ergebnis-Cache für Leseabfragen: max. Anzahl Ergebnisse und Zeilen insgesamt
+RESULT_CACHE_SIZE = 32
+RESULT_CACHE_MAX_ROWS = 500000
+
+# Quelle für Einträge aus dem Formular; Importe verwenden z.B. den Gerätenamen
+MANUAL_SOURCE = "manual"
+
+# Schema-Version in PRAGMA user_version; init_db() führt fehlende Migrationen aus
+SCHEMA_VERSION = 3
+# Zeilen pro Transaktion beim Umkopieren während einer Migration
+MIGRATION_BATCH_SIZE = 50000
+# STRICT-Tabellen gibt es ab SQLite 3.37
+STRICT = " STRICT" if sqlite3.sqlite_version_info >= (3, 37, 0) else ""
+# Freie Seiten werden nicht automatisch, sondern per PRAGMA incremental_vacuum
+# (retention.reclaim_space) in kleinen Schritten an das Dateisystem zurückgegeben
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Einträge liegen in entry: ts sind Sekunden seit 1970, wobei die (naive) Ortszeit wie
+# UTC behandelt wird, damit das Textformat ohne Zeitzonen-Umrechnung erhalten bleibt;
+# mood ist ein Code aus mood_name. health_entry ist eine Sicht im alten Textformat.
+# samples ist die Zahl der Rohwerte, für die die Zeile steht (> 1 nach retention.compact,
+# die Messwerte sind dann Mittelwerte).
+ENTRY_TABLE_SQL = f'''
+    CREATE TABLE IF NOT EXISTS entry (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts INTEGER NOT NULL,
+        weight REAL,
+        blood_sugar REAL,
+        sleep_hours REAL,
+        mood INTEGER,
+        notes TEXT,
+        source TEXT NOT NULL DEFAULT '{MANUAL_SOURCE}',
+        samples INTEGER NOT NULL DEFAULT 1
+    ){STRICT}
+'''
+MOOD_TABLE_SQL = f"CREATE TABLE IF NOT EXISTS mood_name (code INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE){STRICT}"
+# Feste Codes für die Auswahl im Formular (analytics.MOODS hat dieselbe Reihenfolge)
+MOOD_CODES = {"Gut": 0, "Mittel": 1, "Schlecht": 2}
+# Natürlicher Schlüssel: pro Quelle höchstens ein Eintrag je Zeitpunkt; dient auch für Zeitbereiche
+UNIQUE_INDEX_SQL = "CREATE UNIQUE INDEX IF NOT EXISTS idx_entry_ts_source ON entry (ts, source)"
+# Zeilen alter Datenbanken, deren Zeitstempel sich nicht lesen lässt (z.B. "01.02.2024 08:00"
+# aus frühen CSV-Importen), bleiben bei der Migration hier erhalten
+UNPARSED_TABLE = "health_entry_unparsed"
+# Gleicher Zeitpunkt und Quelle, aber andere Werte: ältere Varianten bekommen bei der
+# Migration die Quelle "<quelle>-legacy" (bzw. "-legacy-2", ...) statt zu verschwinden
+LEGACY_SUFFIX = "-legacy"
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+# Umrechnung zwischen ts und dem Textformat in SQL
+TS_TO_TEXT = "strftime('%Y-%m-%d %H:%M', {}, 'unixepoch')"
+TEXT_TO_TS = "CAST(strftime('%s', {}) AS INTEGER)"
+# Grenzen für offene Zeitbereiche (0001-01-01 00:00 bis 9999-12-31 23:59)
+MIN_TS = -62135596800
+MAX_TS = 253402300740
+
+# Spalten, die Leseabfragen liefern: altes Format (Text-Zeitstempel, Befinden als Wort)
+ENTRY_COLUMNS = ("entry.id, " + TS_TO_TEXT.format("entry.ts") + " AS timestamp, entry.weight, entry.blood_sugar, "
+                 "entry.sleep_hours, (SELECT name FROM mood_name WHERE code = entry.mood) AS mood, entry.notes")
+VALUE_COLUMNS = ("weight", "blood_sugar", "sleep_hours", "mood", "notes")
+COMPAT_VIEW_SQL = f'''
+    CREATE VIEW IF NOT EXISTS health_entry AS
+    SELECT {ENTRY_COLUMNS}, entry.source FROM entry
+'''
+# Schreiben über die Sicht (z.B. aus älteren Skripten) landet in entry
+COMPAT_INSERT_TRIGGER_SQL = f'''
+    CREATE TRIGGER IF NOT EXISTS trg_health_entry_insert INSTEAD OF INSERT ON health_entry BEGIN
+        INSERT OR IGNORE INTO mood_name (name) SELECT NEW.mood WHERE NEW.mood IS NOT NULL;
+        INSERT INTO entry (ts, weight, blood_sugar, sleep_hours, mood, notes, source)
+        VALUES ({TEXT_TO_TS.format("NEW.timestamp")}, NEW.weight, NEW.blood_sugar, NEW.sleep_hours,
+                (SELECT code FROM mood_name WHERE name = NEW.mood), NEW.notes,
+                coalesce(NEW.source, '{MANUAL_SOURCE}'));
+    END
+'''
+
+# Einfügen oder, bei gleichem (ts, source), die Messwerte ersetzen. Unveränderte
+# Zeilen werden nicht angefasst, damit Trigger und Änderungszähler nicht auslösen.
+# Ein Rohwert auf dem Schlüssel einer verdichteten Zeile (retention.py) ersetzt
+# diese samt samples, sonst zählte sie neben den übrigen Rohwerten mehrfach.
+# Parameter: Zeitstempel als Text, Messwerte, Befinden als Code, Notizen, Quelle.
+INSERT_SQL = '''
+    INSERT INTO entry (ts, weight, blood_sugar, sleep_hours, mood, notes, source)
+    VALUES ({ts}, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (ts, source) DO UPDATE SET {updates}, samples = 1
+    WHERE ({columns}) IS NOT ({excluded}) OR samples != 1
+'''.format(ts=TEXT_TO_TS.format("?"), updates=", ".join(f"{c} = excluded.{c}" for c in VALUE_COLUMNS),
+           columns=", ".join(VALUE_COLUMNS), excluded=", ".join(f"excluded.{c}" for c in VALUE_COLUMNS))
+EXISTS_SQL = f"SELECT 1 FROM entry WHERE ts = {TEXT_TO_TS.format('?')} AND source = ?"
+# Ergebnis von insert_entry()
+INSERTED, UPDATED, UNCHANGED = "inserted", "updated", "unchanged"
+SELECT_ALL_SQL = f"SELECT {ENTRY_COLUMNS} FROM entry ORDER BY ts"
+SELECT_BETWEEN_SQL = f"SELECT {ENTRY_COLUMNS} FROM entry WHERE ts >= ? AND ts <= ? ORDER BY ts"
+SELECT_LATEST_SQL = f"SELECT {ENTRY_COLUMNS} FROM entry WHERE id IN (SELECT id FROM entry ORDER BY ts DESC LIMIT ?) ORDER BY ts"
+# Rohwerte für NumPy (analytics, column_cache): ts und mood als Zahlen, ohne Umwandlung
+SNAPSHOT_SQL = '''
+    SELECT ts, weight, blood_sugar, sleep_hours, mood FROM entry
+    WHERE ts >= ? AND ts <= ? ORDER BY ts
+'''
+SNAPSHOT_AFTER_SQL = '''
+    SELECT ts, weight, blood_sugar, sleep_hours, mood FROM entry
+    WHERE id > ? ORDER BY id
+'''
+COUNT_SQL = "SELECT COUNT(*) FROM entry WHERE ts >= ? AND ts <= ?"
+PAGE_SQL = f"SELECT {ENTRY_COLUMNS} FROM entry WHERE ts >= ? AND ts <= ? ORDER BY {{order}} LIMIT ? OFFSET ?"
+# Spalten, nach denen in SQL sortiert werden darf (Reihenfolge wie in der Tabelle)
+SORT_COLUMNS = ("timestamp", "weight", "blood_sugar", "sleep_hours", "mood", "notes")
+# ... und ihre Entsprechung in entry (Befinden nach Code: Gut, Mittel, Schlecht)
+SORT_EXPRESSIONS = {"timestamp": "ts"}
+
+# Anzahl und Mittelwerte nach samples gewichtet, damit verdichtete Zeilen zählen wie ihre Rohwerte
+SUMMARY_SQL = '''
+    SELECT coalesce(SUM(samples), 0), {first}, {last},
+           {avg_weight}, MIN(weight), MAX(weight),
+           {avg_blood_sugar}, MIN(blood_sugar), MAX(blood_sugar),
+           {avg_sleep_hours}
+    FROM entry WHERE ts >= ? AND ts <= ?
+'''.format(first=TS_TO_TEXT.format("MIN(ts)"), last=TS_TO_TEXT.format("MAX(ts)"), **{
+    f"avg_{m}": f"SUM({m} * samples) / NULLIF(SUM(({m} IS NOT NULL) * samples), 0)"
+    for m in ("weight", "blood_sugar", "sleep_hours")})
+
+# Tagesweise Aggregate (Anzahl, Summe, Min, Max je Messwert), per Trigger aktuell gehalten.
+# entries und die Summen zählen Rohwerte (Zeilen mit ihrem samples gewichtet), stored die
+# Zeilen in entry.
+ROLLUP_METRICS = ("weight", "blood_sugar", "sleep_hours")
+ROLLUP_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS daily_rollup (
+        day TEXT PRIMARY KEY,
+        entries INTEGER NOT NULL,
+        stored INTEGER NOT NULL,
+        {columns}
+    )
+'''.format(columns=",\n        ".join(
+    f"{m}_n INTEGER NOT NULL, {m}_sum REAL, {m}_min REAL, {m}_max REAL" for m in ROLLUP_METRICS))
+ROLLUP_DAY = "date({}.ts, 'unixepoch')"
+
+
+def _rollup_add_sql(row):
+    """Upsert, das die Werte der Zeile row (NEW) zum Tagesaggregat addiert."""
+    columns = ["day", "entries", "stored"]
+    values = [ROLLUP_DAY.format(row), f"{row}.samples", "1"]
+    updates = [f"entries = entries + {row}.samples", "stored = stored + 1"]
+    for m in ROLLUP_METRICS:
+        columns += [f"{m}_n", f"{m}_sum", f"{m}_min", f"{m}_max"]
+        values += [f"({row}.{m} IS NOT NULL) * {row}.samples", f"{row}.{m} * {row}.samples", f"{row}.{m}", f"{row}.{m}"]
+        updates += [
+            f"{m}_n = {m}_n + ({row}.{m} IS NOT NULL) * {row}.samples",
+            f"{m}_sum = coalesce({m}_sum, 0) + coalesce({row}.{m}, 0) * {row}.samples",
+            f"{m}_min = min(coalesce({m}_min, {row}.{m}), coalesce({row}.{m}, {m}_min))",
+            f"{m}_max = max(coalesce({m}_max, {row}.{m}), coalesce({row}.{m}, {m}_max))",
+        ]
+    return (f"INSERT INTO daily_rollup ({', '.join(columns)}) VALUES ({', '.join(values)}) "
+            f"ON CONFLICT(day) DO UPDATE SET {', '.join(updates)};")
+
+
+def _rollup_remove_sql(row):
+    """Zieht die Werte von row (OLD) ab. Min/Max bleiben als beobachtete Extremwerte stehen."""
+    updates = [f"entries = entries - {row}.samples", "stored = stored - 1"]
+    for m in ROLLUP_METRICS:
+        updates += [f"{m}_n = {m}_n - ({row}.{m} IS NOT NULL) * {row}.samples",
+                    f"{m}_sum = {m}_sum - coalesce({row}.{m}, 0) * {row}.samples"]
+    day = ROLLUP_DAY.format(row)
+    return (f"UPDATE daily_rollup SET {', '.join(updates)} WHERE day = {day}; "
+            f"DELETE FROM daily_rollup WHERE day = {day} AND stored <= 0;")
+
+
+ROLLUP_TRIGGERS_SQL = (
+    f"CREATE TRIGGER IF NOT EXISTS trg_rollup_insert AFTER INSERT ON entry BEGIN {_rollup_add_sql('NEW')} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_rollup_delete AFTER DELETE ON entry BEGIN {_rollup_remove_sql('OLD')} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_rollup_update AFTER UPDATE ON entry "
+    f"BEGIN {_rollup_remove_sql('OLD')} {_rollup_add_sql('NEW')} END",
+)
+ROLLUP_REBUILD_SQL = "INSERT INTO daily_rollup SELECT date(ts, 'unixepoch'), SUM(samples), COUNT(*), {columns} " \
+    "FROM entry GROUP BY date(ts, 'unixepoch')".format(columns=", ".join(
+        f"SUM(({m} IS NOT NULL) * samples), SUM({m} * samples), MIN({m}), MAX({m})" for m in ROLLUP_METRICS))
+
+# Zähler, der bei jeder Änderung an entry steigt (auch durch andere Prozesse).
+# Solange nur eingefügt wird, wachsen Zähler und Zeilenzahl gleich schnell.
+CHANGES_TABLE_SQL = "CREATE TABLE IF NOT EXISTS data_changes (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)"
+CHANGES_TRIGGERS_SQL = tuple(
+    f"CREATE TRIGGER IF NOT EXISTS trg_changes_{op.lower()} AFTER {op} ON entry "
+    f"BEGIN UPDATE data_changes SET value = value + 1 WHERE id = 1; END"
+    for op in ("INSERT", "UPDATE", "DELETE")
+)
+
+# Volltextindex über notes (FTS5, Inhalt bleibt in entry), per Trigger synchron
+FTS_TABLE_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS entry_fts USING fts5(
+        notes, content='entry', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+'''
+FTS_TRIGGERS_SQL = (
+    "CREATE TRIGGER IF NOT EXISTS trg_fts_insert AFTER INSERT ON entry "
+    "BEGIN INSERT INTO entry_fts (rowid, notes) VALUES (NEW.id, NEW.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_fts_delete AFTER DELETE ON entry "
+    "BEGIN INSERT INTO entry_fts (entry_fts, rowid, notes) VALUES ('delete', OLD.id, OLD.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_fts_update AFTER UPDATE OF notes ON entry "
+    "BEGIN INSERT INTO entry_fts (entry_fts, rowid, notes) VALUES ('delete', OLD.id, OLD.notes); "
+    "INSERT INTO entry_fts (rowid, notes) VALUES (NEW.id, NEW.notes); END",
+)
+SEARCH_SQL = f'''
+    SELECT {ENTRY_COLUMNS} FROM entry_fts JOIN entry ON entry.id = entry_fts.rowid
+    WHERE entry_fts MATCH ? AND entry.ts >= ? AND entry.ts <= ?
+    ORDER BY bm25(entry_fts), entry.ts DESC LIMIT ?
+'''
+# Ersatz, falls SQLite ohne FTS5 gebaut ist (durchsucht notes in SQL, ohne Ranking)
+SEARCH_LIKE_SQL = f'''
+    SELECT {ENTRY_COLUMNS} FROM entry
+    WHERE {{conditions}} AND ts >= ? AND ts <= ?
+    ORDER BY ts DESC LIMIT ?
+'''
+SEARCH_LIMIT = 1000
+
+# Bis zu welchem Zeitstempel eine Quelle schon importiert wurde
+WATERMARK_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS sync_watermark (
+        source TEXT PRIMARY KEY,
+        last_timestamp TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+'''
+
+# Warnungen zu einzelnen Einträgen und der Zustand der laufenden Statistiken je Messwert (alerts.py)
+ALERT_TABLE_SQL = f'''
+    CREATE TABLE IF NOT EXISTS alert (
+        id INTEGER PRIMARY KEY,
+        entry_id INTEGER NOT NULL,
+        ts INTEGER NOT NULL,
+        metric TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        value REAL NOT NULL,
+        message TEXT NOT NULL
+    ){STRICT}
+'''
+ALERT_INDEXES_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_alert_entry ON alert (entry_id)",
+    "CREATE INDEX IF NOT EXISTS idx_alert_ts ON alert (ts)",
+)
+ALERT_STATE_TABLE_SQL = f'''
+    CREATE TABLE IF NOT EXISTS alert_state (
+        metric TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL,
+        state TEXT NOT NULL
+    ){STRICT}
+'''
+ALERTS_SQL = f'''
+    SELECT id, entry_id, {TS_TO_TEXT.format("ts")}, metric, kind, value, message
+    FROM alert ORDER BY ts DESC, id DESC LIMIT ?
+'''
+ALERT_LIMIT = 1000
+
+# Zeitraum-Schlüssel je Auflösung (Woche = Datum des Montags)
+PERIODS = {
+    "day": "day",
+    "week": "date(day, 'weekday 0', '-6 days')",
+    "month": "substr(day, 1, 7)",
+}
+AVERAGES_SQL = '''
+    SELECT {period} AS period, SUM(entries),
+           SUM(weight_sum) / NULLIF(SUM(weight_n), 0), MIN(weight_min), MAX(weight_max),
+           SUM(blood_sugar_sum) / NULLIF(SUM(blood_sugar_n), 0), MIN(blood_sugar_min), MAX(blood_sugar_max),
+           SUM(sleep_hours_sum) / NULLIF(SUM(sleep_hours_n), 0)
+    FROM daily_rollup WHERE day >= ? AND day <= ?
+    GROUP BY period ORDER BY period {direction} {limit}
+'''
+AVERAGE_KEYS = ("period", "entries", "weight_avg", "weight_min", "weight_max",
+                "sugar_avg", "sugar_min", "sugar_max", "sleep_avg")
+
+_local = threading.local()
+# Wird bei jedem Commit über transaction() erhöht (Schreibzugriffe dieses Prozesses)
+_write_generation = 0
+_connections = set()
+_connections_lock = threading.Lock()
+# Wird von close_all_connections() erhöht; Threads öffnen dann beim nächsten Zugriff neu
+_connections_generation = 0
+# (DB_FILE, Funktion, Parameter) -> (Datenstand, Zeilen, Ergebnis), älteste zuerst
+_results = OrderedDict()
+_results_rows = 0
+_results_lock = threading.Lock()
+_results_stats = {"hits": 0, "misses": 0}
+# Ob die Datenbank den FTS5-Index hat (wird in init_db() gesetzt)
+_fts_available = {}
+_forget_callbacks = []
+
+
+def connect(path=None):
+    """Öffnet eine neue, getunte Verbindung (ohne sie im Pool zu registrieren)."""
+    conn = sqlite3.connect(
+        path or DB_FILE,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,
+    )
+    try:
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+    except sqlite3.DatabaseError:
+        conn.close()  # z.B. keine SQLite-Datei; Datei nicht offen halten (backup.swap_in)
+        raise
+    return conn
+
+
+def get_connection():
+    """Liefert die langlebige Verbindung des aktuellen Threads.
+
+    Jeder Thread bekommt genau eine Verbindung, die offen bleibt, bis
+    close_connection() bzw. close_all_connections() aufgerufen wird oder
+    DB_FILE geändert wurde.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_FILE and _local.generation == _connections_generation:
+        return conn
+    if conn is not None:
+        close_connection()
+    conn = connect(DB_FILE)
+    _local.conn = conn
+    _local.path = DB_FILE
+    _local.generation = _connections_generation
+    _local.moods = {}  # Befinden -> Code, siehe _mood_code()
+    with _connections_lock:
+        _connections.add(conn)
+    return conn
+
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    _local.conn = None
+    with _connections_lock:
+        _connections.discard(conn)
     conn.close()
 
+
+def close_all_connections():
+    """Schließt alle Verbindungen aller Threads, z.B. vor dem Beenden."""
+    global _connections_generation
+    with _connections_lock:
+        conns = list(_connections)
+        _connections.clear()
+        _connections_generation += 1
+    for conn in conns:
+        conn.close()
+    _local.conn = None
+
+
+def forget_database():
+    """Schließt alle Verbindungen und verwirft, was zur Datei zwischengespeichert ist.
+
+    Nötig, wenn DB_FILE auf der Platte ausgetauscht wurde (backup.restore_backup):
+    Ergebnis-Cache und FTS-Erkennung könnten sonst zur alten Datei passen.
+    """
+    close_all_connections()
+    clear_result_cache()
+    _fts_available.pop(DB_FILE, None)
+    for func in _forget_callbacks:
+        func()
+
+
+def on_forget(func):
+    """Meldet func an, damit forget_database() auch Caches anderer Module leert."""
+    _forget_callbacks.append(func)
+    return func
+
+
+@contextmanager
+def transaction():
+    """Führt den Block in einer Transaktion aus (Commit bzw. Rollback)."""
+    global _write_generation
+    conn = get_connection()
+    try:
+        with conn:
+            yield conn
+    except BaseException:
+        # In der Transaktion vergebene Codes aus mood_name sind mit zurückgerollt
+        _local.moods = {}
+        raise
+    _write_generation += 1
+
+
+def get_data_version():
+    """Kennung des Datenstands für Caches außerhalb dieses Moduls (z.B. report.analyse).
+
+    Wie beim Ergebnis-Cache: Datei plus _result_version(). Wird die Datei
+    selbst ausgetauscht, leert forget_database() die mit on_forget()
+    angemeldeten Caches.
+    """
+    return (DB_FILE, *_result_version(get_connection()))
+
+
+def _result_version(conn):
+    """Datenstand für den Ergebnis-Cache.
+
+    data_changes wird per Trigger bei jeder Änderung an entry erhöht,
+    egal über welche Verbindung oder welchen Prozess, und ist anders als
+    PRAGMA data_version zwischen den Verbindungen der Threads vergleichbar.
+    _write_generation deckt eigene Schreibzugriffe ab, die nur andere
+    Tabellen ändern (z.B. rebuild_rollups).
+    """
+    return _write_generation, conn.execute("SELECT value FROM data_changes WHERE id = 1").fetchone()[0]
+
+
+def cached_result(func):
+    """Dekorator: merkt sich Ergebnisse je Parameter, bis sich die Daten ändern.
+
+    Begrenzt auf RESULT_CACHE_SIZE Einträge und RESULT_CACHE_MAX_ROWS Zeilen
+    (LRU). Innerhalb offener Transaktionen wird nichts gecacht, da der
+    Datenstand dort noch zurückgerollt werden kann. Listen und Dicts werden
+    als flache Kopie zurückgegeben.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _results_rows
+        conn = get_connection()
+        if conn.in_transaction:
+            return func(*args, **kwargs)
+        key = (DB_FILE, func.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            version = _result_version(conn)
+        except sqlite3.OperationalError:  # Datenbank ohne init_db()
+            return func(*args, **kwargs)
+        with _results_lock:
+            cached = _results.get(key)
+            if cached is not None and cached[0] == version:
+                _results.move_to_end(key)
+                _results_stats["hits"] += 1
+                return _copy_result(cached[2])
+            _results_stats["misses"] += 1
+        result = func(*args, **kwargs)
+        rows = len(result) if isinstance(result, list) else 1
+        with _results_lock:
+            old = _results.pop(key, None)
+            if old is not None:
+                _results_rows -= old[1]
+            if rows <= RESULT_CACHE_MAX_ROWS:
+                _results[key] = (version, rows, result)
+                _results_rows += rows
+                while len(_results) > RESULT_CACHE_SIZE or _results_rows > RESULT_CACHE_MAX_ROWS:
+                    _results_rows -= _results.popitem(last=False)[1][1]
+        return _copy_result(result)
+    return wrapper
+
+
+def _copy_result(result):
+    return result.copy() if isinstance(result, (list, dict)) else result
+
+
+def clear_result_cache():
+    global _results_rows
+    with _results_lock:
+        _results.clear()
+        _results_rows = 0
+
+
+def result_cache_info():
+    """Treffer, Fehlzugriffe, Einträge und Zeilen des Ergebnis-Caches."""
+    with _results_lock:
+        return dict(_results_stats, entries=len(_results), rows=_results_rows)
+
+
+@timed("db.init_db")
+def init_db():
+    """Legt das Schema an bzw. bringt eine bestehende Datenbank auf SCHEMA_VERSION."""
+    conn = get_connection()
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Datenbank hat Schema-Version {version}, unterstützt wird bis {SCHEMA_VERSION}")
+    if version == 0:
+        # Wirkt sofort bei einer neuen Datei bzw. mit dem VACUUM am Ende der ersten Migration
+        conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        MIGRATIONS[number](conn)
+    _fts_available[DB_FILE] = _table_exists(conn, "entry_fts")
+
+
+def _table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).fetchone() is not None
+
+
+def _create_schema(conn):
+    """Tabellen, Sicht, Indizes und Trigger der aktuellen Version (alles IF NOT EXISTS)."""
+    conn.execute(ENTRY_TABLE_SQL)
+    conn.execute(MOOD_TABLE_SQL)
+    conn.executemany("INSERT OR IGNORE INTO mood_name (code, name) VALUES (?, ?)",
+                     [(code, name) for name, code in MOOD_CODES.items()])
+    conn.execute(UNIQUE_INDEX_SQL)
+    conn.execute(COMPAT_VIEW_SQL)
+    conn.execute(COMPAT_INSERT_TRIGGER_SQL)
+    conn.execute(WATERMARK_TABLE_SQL)
+    _create_alert_tables(conn)
+    conn.execute(ROLLUP_TABLE_SQL)
+    for sql in ROLLUP_TRIGGERS_SQL:
+        conn.execute(sql)
+    conn.execute(CHANGES_TABLE_SQL)
+    conn.execute("INSERT OR IGNORE INTO data_changes (id, value) VALUES (1, 0)")
+    for sql in CHANGES_TRIGGERS_SQL:
+        conn.execute(sql)
+    try:
+        conn.execute(FTS_TABLE_SQL)
+    except sqlite3.OperationalError:  # SQLite ohne FTS5
+        return
+    for sql in FTS_TRIGGERS_SQL:
+        conn.execute(sql)
+
+
+def _create_alert_tables(conn):
+    conn.execute(ALERT_TABLE_SQL)
+    for sql in ALERT_INDEXES_SQL:
+        conn.execute(sql)
+    conn.execute(ALERT_STATE_TABLE_SQL)
+
+
+def _migrate_typed_schema(conn):
+    """Version 1: Text-Zeitstempel und Befinden als Wort -> entry mit ts und mood-Code.
+
+    Die alte Tabelle health_entry wird blockweise (nach id) nach entry
+    kopiert, jeder Block in einer eigenen Transaktion; ein abgebrochener
+    Lauf setzt beim nächsten Start hinter der höchsten kopierten id fort.
+    Mehrfach gespeicherte Einträge (gleicher Zeitpunkt, gleiche Quelle und
+    Werte) werden zu einem zusammengefasst. Weichen die Werte ab, behält der
+    zuletzt eingefügte die Quelle, die übrigen bekommen LEGACY_SUFFIX (Anzahl
+    auf stderr). Welche Zeile mit welcher Quelle übernommen wird, steht in
+    migrate_keep. Zeilen ohne lesbaren Zeitstempel werden
+    unverändert nach UNPARSED_TABLE verschoben (mit Hinweis auf stderr).
+    Danach werden Sicht, Aggregate und Suchindex neu aufgebaut und die Datei
+    mit VACUUM verkleinert.
+    """
+    legacy = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'health_entry'").fetchone()
+    if not legacy:
+        with transaction():
+            _create_schema(conn)
+            conn.execute("PRAGMA user_version = 1")
+        return
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(health_entry)")}
+    source = "coalesce(source, :manual)" if "source" in columns else ":manual"
+    with transaction():
+        conn.execute(ENTRY_TABLE_SQL)
+        conn.execute(MOOD_TABLE_SQL)
+        conn.executemany("INSERT OR IGNORE INTO mood_name (code, name) VALUES (?, ?)",
+                         [(code, name) for name, code in MOOD_CODES.items()])
+        conn.execute("INSERT OR IGNORE INTO mood_name (name) "
+                     "SELECT DISTINCT mood FROM health_entry WHERE mood IS NOT NULL")
+        conn.execute(UNIQUE_INDEX_SQL)
+        # Einmal für die ganze Tabelle, damit ein fortgesetzter Lauf dieselbe Zuordnung verwendet
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS migrate_keep AS
+            WITH variant AS (
+                SELECT MAX(id) AS id, ts, src FROM (
+                    SELECT id, {TEXT_TO_TS.format("timestamp")} AS ts, {source} AS src,
+                           weight, blood_sugar, sleep_hours, mood, notes
+                    FROM health_entry
+                ) WHERE ts IS NOT NULL
+                GROUP BY ts, src, weight, blood_sugar, sleep_hours, mood, notes
+            )
+            SELECT id, CASE n WHEN 1 THEN src WHEN 2 THEN src || :suffix
+                              ELSE src || :suffix || '-' || (n - 1) END AS source, n > 1 AS renamed
+            FROM (SELECT id, src, ROW_NUMBER() OVER (PARTITION BY ts, src ORDER BY id DESC) AS n FROM variant)
+        ''', {"manual": MANUAL_SOURCE, "suffix": LEGACY_SUFFIX})
+    copy_sql = f'''
+        INSERT OR IGNORE INTO entry (id, ts, weight, blood_sugar, sleep_hours, mood, notes, source)
+        SELECT h.id, {TEXT_TO_TS.format("h.timestamp")}, h.weight, h.blood_sugar, h.sleep_hours,
+               (SELECT code FROM mood_name WHERE name = h.mood), h.notes, k.source
+        FROM health_entry h JOIN migrate_keep k ON k.id = h.id WHERE h.id > ? AND h.id <= ?
+    '''
+    last_id = conn.execute("SELECT coalesce(MAX(id), 0) FROM entry").fetchone()[0]
+    max_id = conn.execute("SELECT coalesce(MAX(id), 0) FROM health_entry").fetchone()[0]
+    while last_id < max_id:
+        upper = last_id + MIGRATION_BATCH_SIZE
+        with transaction():
+            conn.execute(copy_sql, (last_id, upper))
+        last_id = upper
+
+    unparsed_sql = f"SELECT * FROM health_entry WHERE {TEXT_TO_TS.format('timestamp')} IS NULL"
+    with transaction():
+        conn.execute("BEGIN IMMEDIATE")  # DDL startet sonst keine Transaktion, der Umbau soll atomar sein
+        unparsed = conn.execute(f"SELECT COUNT(*) FROM ({unparsed_sql})").fetchone()[0]
+        if unparsed:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {UNPARSED_TABLE} AS {unparsed_sql}")
+        renamed = conn.execute("SELECT COUNT(*) FROM migrate_keep WHERE renamed").fetchone()[0]
+        conn.execute("DROP TABLE migrate_keep")
+        conn.execute("DROP TABLE health_entry")  # entfernt auch die alten Trigger und Indizes
+        conn.execute("DROP TABLE IF EXISTS entry_fts")  # verwies auf health_entry
+        conn.execute("DROP TABLE IF EXISTS daily_rollup")
+        _create_schema(conn)
+        conn.execute(ROLLUP_REBUILD_SQL)
+        if _table_exists(conn, "entry_fts"):
+            conn.execute("INSERT INTO entry_fts (entry_fts) VALUES ('rebuild')")
+        # Caches außerhalb von SQLite (column_cache) sollen neu aufbauen
+        conn.execute("UPDATE data_changes SET value = value + 1 WHERE id = 1")
+        conn.execute("PRAGMA user_version = 1")
+    conn.execute("VACUUM")
+    if unparsed:
+        print(f"{DB_FILE}: {unparsed} Einträge ohne lesbaren Zeitstempel nach Tabelle {UNPARSED_TABLE} "
+              "verschoben", file=sys.stderr)
+    if renamed:
+        print(f"{DB_FILE}: {renamed} Einträge mit gleichem Zeitpunkt, aber anderen Werten unter Quelle "
+              f"*{LEGACY_SUFFIX} behalten", file=sys.stderr)
+
+
+def _migrate_samples(conn):
+    """Version 2: entry.samples für verdichtete Zeilen, gewichtete Tagesaggregate, inkrementelles VACUUM.
+
+    daily_rollup bekommt die Spalte stored und wird mit den neuen Triggern
+    neu aufgebaut. Datenbanken ohne auto_vacuum = INCREMENTAL werden einmal
+    komplett mit VACUUM umgeschrieben, da sich die Einstellung nur so
+    ändern lässt.
+    """
+    with transaction():
+        conn.execute("BEGIN IMMEDIATE")
+        if "samples" not in {row[1] for row in conn.execute("PRAGMA table_info(entry)")}:
+            conn.execute("ALTER TABLE entry ADD COLUMN samples INTEGER NOT NULL DEFAULT 1")
+        if "stored" not in {row[1] for row in conn.execute("PRAGMA table_info(daily_rollup)")}:
+            for name in ("insert", "delete", "update"):
+                conn.execute(f"DROP TRIGGER IF EXISTS trg_rollup_{name}")
+            conn.execute("DROP TABLE daily_rollup")
+            conn.execute(ROLLUP_TABLE_SQL)
+            for sql in ROLLUP_TRIGGERS_SQL:
+                conn.execute(sql)
+            conn.execute(ROLLUP_REBUILD_SQL)
+        conn.execute("PRAGMA user_version = 2")
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+        conn.execute("VACUUM")
+
+
+def _migrate_alerts(conn):
+    """Version 3: Tabellen für Warnungen (alerts.py); bestehende Einträge prüft alerts.evaluate()."""
+    with transaction():
+        conn.execute("BEGIN IMMEDIATE")
+        _create_alert_tables(conn)
+        conn.execute("PRAGMA user_version = 3")
+
+
+# Schema-Version -> Funktion, die von der Vorgängerversion dorthin migriert
+MIGRATIONS = {
+    1: _migrate_typed_schema,
+    2: _migrate_samples,
+    3: _migrate_alerts,
+}
+
+
+@timed("db.rebuild_rollups")
+def rebuild_rollups():
+    """Berechnet daily_rollup komplett neu aus entry."""
+    with transaction() as conn:
+        conn.execute("DELETE FROM daily_rollup")
+        conn.execute(ROLLUP_REBUILD_SQL)
+
+
+def _mood_code(conn, name):
+    """Code zu einem Befinden; unbekannte Wörter bekommen einen neuen Code."""
+    codes = _local.moods
+    code = codes.get(name)
+    if code is None and name is not None:
+        conn.execute("INSERT OR IGNORE INTO mood_name (name) VALUES (?)", (name,))
+        code = codes[name] = conn.execute("SELECT code FROM mood_name WHERE name = ?", (name,)).fetchone()[0]
+    return code
+
+
+@timed("db.insert_entry")
 def insert_entry(entry):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO health_entry (timestamp, weight, blood_sugar, sleep_hours, mood, notes)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (
-        entry['timestamp'],
-        entry['weight'],
-        entry['blood_sugar'],
-        entry['sleep_hours'],
-        entry['mood'],
-        entry['notes']
-    ))
-    conn.commit()
-    conn.close()
+    """Speichert einen Eintrag; ein vorhandener mit gleicher Zeit und Quelle wird ersetzt.
+
+    Gibt INSERTED, UPDATED oder UNCHANGED (gleiche Werte, nichts geschrieben) zurück.
+    """
+    source = entry.get('source', MANUAL_SOURCE)
+    with transaction() as conn:
+        exists = conn.execute(EXISTS_SQL, (entry['timestamp'], source)).fetchone()
+        changed = conn.execute(INSERT_SQL, (
+            entry['timestamp'],
+            entry['weight'],
+            entry['blood_sugar'],
+            entry['sleep_hours'],
+            _mood_code(conn, entry['mood']),
+            entry['notes'],
+            source
+        )).rowcount
+    if not changed:
+        return UNCHANGED
+    return UPDATED if exists else INSERTED
+
+
+def entry_exists(timestamp, source=MANUAL_SOURCE):
+    """Ob es zu Zeitpunkt (Text) und Quelle schon einen Eintrag gibt (insert_entry ersetzt ihn)."""
+    return get_connection().execute(EXISTS_SQL, (timestamp, source)).fetchone() is not None
+
+
+@timed("db.insert_entries", rows=int)
+def insert_entries(rows, conn=None, source=MANUAL_SOURCE):
+    """Fügt viele Einträge mit executemany ein (Upsert über timestamp und source).
+
+    rows ist eine Folge von Tupeln (timestamp, weight, blood_sugar,
+    sleep_hours, mood, notes). Ohne conn läuft alles in einer eigenen
+    Transaktion, sonst in der des Aufrufers. Gibt die Anzahl der neuen oder
+    geänderten Zeilen zurück.
+    """
+    if conn is None:
+        with transaction() as conn:
+            return insert_entries(rows, conn, source)
+    codes = _local.moods
+    rows = ((ts, weight, sugar, sleep, codes[mood] if mood in codes else _mood_code(conn, mood), notes, source)
+            for ts, weight, sugar, sleep, mood, notes in rows)
+    return conn.executemany(INSERT_SQL, rows).rowcount
 
+
+def get_watermark(source):
+    """Letzter bereits importierter Zeitstempel der Quelle oder None."""
+    row = get_connection().execute(
+        "SELECT last_timestamp FROM sync_watermark WHERE source = ?", (source,)).fetchone()
+    return row[0] if row else None
+
+
+def set_watermark(source, timestamp, conn=None):
+    """Setzt die Marke der Quelle auf timestamp (nur vorwärts)."""
+    sql = ("INSERT INTO sync_watermark (source, last_timestamp, updated_at) VALUES (?, ?, ?) "
+           "ON CONFLICT (source) DO UPDATE SET last_timestamp = max(last_timestamp, excluded.last_timestamp), "
+           "updated_at = excluded.updated_at")
+    params = (source, to_timestamp(timestamp), datetime.now().strftime(TIMESTAMP_FORMAT))
+    if conn is None:
+        with transaction() as conn:
+            conn.execute(sql, params)
+    else:
+        conn.execute(sql, params)
+
+
+def reset_watermark(source):
+    """Vergisst die Marke, damit der nächste Import die ganze Datei abgleicht."""
+    with transaction() as conn:
+        conn.execute("DELETE FROM sync_watermark WHERE source = ?", (source,))
+
+
+@timed("db.get_all_entries", rows=len)
+@cached_result
 def get_all_entries():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM health_entry ORDER BY timestamp")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
\ No newline at end of file
+    return get_connection().execute(SELECT_ALL_SQL).fetchall()
+
+
+def to_timestamp(value):
+    """Wandelt datetime-Objekte in das Textformat "YYYY-MM-DD HH:MM" um."""
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    return value
+
+
+def to_epoch(value):
+    """datetime oder Text ("YYYY-MM-DD[ HH:MM[:SS]]") als ts (Ortszeit wie UTC, siehe entry)."""
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value)
+    return calendar.timegm(value.timetuple())
+
+
+@timed("db.get_entries_between", rows=len)
+@cached_result
+def get_entries_between(start=None, end=None):
+    """Einträge mit start <= timestamp <= end, zeitlich sortiert.
+
+    start und end sind datetime-Objekte oder Text im Format
+    "YYYY-MM-DD HH:MM"; None bedeutet offene Grenze.
+    """
+    return get_connection().execute(SELECT_BETWEEN_SQL, _range(start, end)).fetchall()
+
+
+def _iter_query(sql, params, chunk_size):
+    cursor = get_connection().cursor()
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def iter_entries(start=None, end=None, chunk_size=5000):
+    """Liefert die Einträge im Zeitbereich blockweise (Listen von Zeilen).
+
+    Es wird ein eigener Cursor mit fetchmany verwendet, daher liegt nie
+    mehr als ein Block im Speicher.
+    """
+    return _iter_query(SELECT_BETWEEN_SQL, _range(start, end), chunk_size)
+
+
+def iter_snapshot_rows(start=None, end=None, chunk_size=50000):
+    """Wie iter_entries, aber nur (timestamp, weight, blood_sugar, sleep_hours, mood)."""
+    return _iter_query(SNAPSHOT_SQL, _range(start, end), chunk_size)
+
+
+def get_change_state():
+    """(Änderungszähler, Zeilenzahl, größte id) in einer Abfrage, für Caches außerhalb von SQLite."""
+    return get_connection().execute(
+        "SELECT (SELECT value FROM data_changes WHERE id = 1), "
+        "(SELECT coalesce(SUM(stored), 0) FROM daily_rollup), "  # schneller als COUNT(*) auf entry
+        "(SELECT coalesce(MAX(id), 0) FROM entry)"
+    ).fetchone()
+
+
+def iter_snapshot_rows_after(last_id, chunk_size=50000):
+    """Wie iter_snapshot_rows, aber nur Zeilen mit id > last_id (in id-Reihenfolge)."""
+    return _iter_query(SNAPSHOT_AFTER_SQL, (last_id,), chunk_size)
+
+
+def fts_query(text):
+    """Suchtext als FTS5-Abfrage: alle Wörter müssen vorkommen, das letzte auch als Wortanfang.
+
+    Jedes Wort wird in Anführungszeichen gesetzt, damit Sonderzeichen und
+    Operatoren (AND, OR, -, *) aus der Eingabe keine Syntaxfehler erzeugen.
+    """
+    words = text.replace('"', " ").split()
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def _has_fts():
+    if DB_FILE not in _fts_available:
+        _fts_available[DB_FILE] = get_connection().execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'entry_fts'").fetchone() is not None
+    return _fts_available[DB_FILE]
+
+
+@timed("db.search_entries", rows=len)
+@cached_result
+def search_entries(query, start=None, end=None, limit=SEARCH_LIMIT):
+    """Einträge, deren Bemerkung alle Wörter aus query enthält, nach Relevanz (bm25) sortiert.
+
+    Groß-/Kleinschreibung und Akzente werden ignoriert, das letzte Wort
+    passt auch als Wortanfang (Suche während der Eingabe).
+    """
+    match = fts_query(query)
+    if match is None:
+        return []
+    if _has_fts():
+        return get_connection().execute(SEARCH_SQL, (match, *_range(start, end), limit)).fetchall()
+    words = query.split()
+    sql = SEARCH_LIKE_SQL.format(conditions=" AND ".join(["notes LIKE ? ESCAPE '\\'"] * len(words)))
+    patterns = ["%" + w.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%" for w in words]
+    return get_connection().execute(sql, (*patterns, *_range(start, end), limit)).fetchall()
+
+
+@timed("db.get_summary")
+@cached_result
+def get_summary(start=None, end=None):
+    """Kennzahlen über den Zeitbereich als Dict, berechnet in SQL."""
+    row = get_connection().execute(SUMMARY_SQL, _range(start, end)).fetchone()
+    keys = ("count", "first", "last", "weight_avg", "weight_min", "weight_max",
+            "sugar_avg", "sugar_min", "sugar_max", "sleep_avg")
+    return dict(zip(keys, row))
+
+
+@timed("db.get_averages", rows=len)
+@cached_result
+def get_averages(period="day", start=None, end=None, limit=None, newest_first=False):
+    """Durchschnitte je Tag, Woche oder Monat aus daily_rollup.
+
+    Kostet O(Anzahl Tage im Bereich), unabhängig von der Zahl der Rohwerte.
+    Gibt eine Liste von Dicts (siehe AVERAGE_KEYS) zurück; Wochen werden
+    mit dem Datum ihres Montags bezeichnet.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unbekannter Zeitraum: {period}")
+    start = "" if start is None else to_timestamp(start)
+    end = "9999-12-31" if end is None else to_timestamp(end)
+    sql = AVERAGES_SQL.format(period=PERIODS[period], direction="DESC" if newest_first else "ASC",
+                              limit="LIMIT ?" if limit else "")
+    params = (start[:10], end[:10]) + ((limit,) if limit else ())
+    return [dict(zip(AVERAGE_KEYS, row)) for row in get_connection().execute(sql, params)]
+
+
+@timed("db.get_latest", rows=len)
+@cached_result
+def get_latest(n):
+    """Die n neuesten Einträge, zeitlich aufsteigend sortiert."""
+    return get_connection().execute(SELECT_LATEST_SQL, (n,)).fetchall()
+
+
+def _range(start, end):
+    return (MIN_TS if start is None else to_epoch(start),
+            MAX_TS if end is None else to_epoch(end))
+
+
+@timed("db.count_entries")
+@cached_result
+def count_entries(start=None, end=None):
+    return get_connection().execute(COUNT_SQL, _range(start, end)).fetchone()[0]
+
+
+@timed("db.get_entries_page", rows=len)
+@cached_result
+def get_entries_page(offset, limit, start=None, end=None, order_by="timestamp", descending=False):
+    """Eine Seite von Einträgen, in SQL sortiert und begrenzt."""
+    if order_by not in SORT_COLUMNS:
+        raise ValueError(f"Unbekannte Sortierspalte: {order_by}")
+    direction = "DESC" if descending else "ASC"
+    # id als zweites Kriterium, damit die Seiten bei gleichen Werten stabil bleiben
+    sql = PAGE_SQL.format(order=f"{SORT_EXPRESSIONS.get(order_by, order_by)} {direction}, id {direction}")
+    return get_connection().execute(sql, (*_range(start, end), limit, offset)).fetchall()
+
+
+def get_alerts(limit=ALERT_LIMIT):
+    """Die neuesten Warnungen: (id, entry_id, timestamp, metric, kind, value, message)."""
+    return get_connection().execute(ALERTS_SQL, (limit,)).fetchall()
+
+
+def get_alert_messages(entry_ids):
+    """Meldungen je Eintrag für die angegebenen ids (für die Tabelle), als Dict id -> Text."""
+    if not entry_ids:
+        return {}
+    placeholders = ", ".join("?" * len(entry_ids))
+    return dict(get_connection().execute(
+        f"SELECT entry_id, group_concat(message, '\n') FROM alert WHERE entry_id IN ({placeholders}) "
+        "GROUP BY entry_id", list(entry_ids)))
@@ -0,0 +1,84 @@
+import numpy as np
+
+
+def visible_slice(x, x_min, x_max):
+    """Indexbereich der Punkte in [x_min, x_max] plus je einem Nachbarn links und rechts.
+
+    Die Nachbarn sorgen dafür, dass Linien bis an den Rand des Ausschnitts gezeichnet werden.
+    """
+    start = max(int(np.searchsorted(x, x_min, side="left")) - 1, 0)
+    stop = min(int(np.searchsorted(x, x_max, side="right")) + 1, len(x))
+    return start, stop
+
+
+def minmax(x, y, buckets):
+    """Behält je Pixel-Bucket den ersten, kleinsten und größten Wert.
+
+    x muss aufsteigend sortiert sein. Spitzen bleiben dadurch immer sichtbar.
+    Gibt die Indizes der behaltenen Punkte zurück.
+    """
+    n = len(x)
+    if n <= 3 * buckets or buckets < 1:
+        return np.arange(n)
+    span = x[-1] - x[0]
+    if span <= 0:
+        bucket = np.arange(n) * buckets // n
+    else:
+        bucket = np.minimum(((x - x[0]) / span * buckets).astype(np.int64), buckets - 1)
+    # x ist sortiert, also liegen die Buckets zusammenhängend hintereinander
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    segment = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+    keep = [starts, [n - 1]]
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(y, starts)
+        hits = np.flatnonzero(y == extreme[segment])
+        _, first = np.unique(segment[hits], return_index=True)
+        keep.append(hits[first])
+    keep = np.concatenate(keep)
+    return np.unique(keep)
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: wählt threshold Punkte, die die Form erhalten.
+
+    Gibt die Indizes der behaltenen Punkte zurück.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Mittelwert des nächsten Buckets als dritter Dreieckspunkt
+        next_lo = hi
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+METHODS = {"minmax": minmax, "lttb": lttb}
+
+
+def downsample(x, y, x_min, x_max, target, method="minmax"):
+    """Reduziert die Punkte im sichtbaren Bereich auf etwa target Stück.
+
+    x und y sind NumPy-Arrays, x aufsteigend sortiert und ohne NaN in y.
+    Bei wenigen Punkten wird der Ausschnitt unverändert zurückgegeben.
+    """
+    start, stop = visible_slice(x, x_min, x_max)
+    xs, ys = x[start:stop], y[start:stop]
+    if len(xs) <= target:
+        return xs, ys
+    if method == "minmax":
+        idx = minmax(xs, ys, max(target // 3, 1))
+    else:
+        idx = METHODS[method](xs, ys, target)
+    return xs[idx], ys[idx]
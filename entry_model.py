@@ -0,0 +1,155 @@
+from collections import OrderedDict
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PySide6.QtGui import QColor
+
+from database import SORT_COLUMNS, count_entries, get_alert_messages, get_entries_page, search_entries
+from perf import timed
+
+HEADERS = ["Datum", "Gewicht", "Zucker", "Schlaf", "Befinden", "Bemerkung"]
+# Schriftfarbe für Einträge mit Warnungen (alerts.py); die Meldungen stehen im Tooltip
+ALERT_COLOR = QColor("#ff6b6b")
+
+
+class EntryTableModel(QAbstractTableModel):
+    """Tabellenmodell, das Einträge seitenweise aus SQLite nachlädt.
+
+    Die View fordert über canFetchMore/fetchMore weitere Zeilen an, sobald
+    gescrollt wird. Im Speicher liegen höchstens max_pages Seiten; ältere
+    Seiten werden verworfen und bei Bedarf neu abgefragt.
+
+    Mit set_search() zeigt das Modell stattdessen die Treffer der
+    Volltextsuche über die gesamte Historie, nach Relevanz sortiert (bis
+    ein Spaltenkopf angeklickt wird).
+
+    Zu jeder Seite werden die Warnungen ihrer Einträge mitgeladen.
+    """
+
+    def __init__(self, page_size=500, max_pages=20, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.start = None
+        self.end = None
+        self.order_by = "timestamp"
+        self.descending = False
+        self._pages = OrderedDict()
+        self.search = None
+        self.ranked = True
+        self._matches = None
+        self._match_alerts = {}
+        self._total = 0
+        self._loaded = 0
+
+    def set_range(self, start=None, end=None):
+        self.start = start
+        self.end = end
+        self.refresh()
+
+    def set_search(self, text):
+        """Filtert auf Einträge, deren Bemerkung text enthält; leerer Text zeigt wieder alles."""
+        self.search = text.strip() or None
+        self.ranked = True
+        self.refresh()
+
+    @timed("gui.table_refresh")
+    def refresh(self):
+        """Verwirft alle geladenen Seiten und zählt die Einträge neu."""
+        self.beginResetModel()
+        self._pages.clear()
+        if self.search:
+            self._matches = search_entries(self.search)
+            if not self.ranked:
+                self._sort_matches()
+            self._match_alerts = get_alert_messages([r[0] for r in self._matches])
+            self._total = len(self._matches)
+        else:
+            self._matches = None
+            self._match_alerts = {}
+            self._total = count_entries(self.start, self.end)
+        self._loaded = min(self.page_size, self._total)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < self._total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.page_size, self._total - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    @timed("gui.refresh_alerts")
+    def refresh_alerts(self):
+        """Lädt die Warnungen der geladenen Seiten neu (nach alerts.evaluate())."""
+        for page_no, (page, _) in list(self._pages.items()):
+            self._pages[page_no] = (page, get_alert_messages([r[0] for r in page]))
+        if self._matches is not None:
+            self._match_alerts = get_alert_messages([r[0] for r in self._matches])
+        if self._loaded:
+            self.dataChanged.emit(self.index(0, 0), self.index(self._loaded - 1, len(HEADERS) - 1),
+                                  [Qt.ForegroundRole, Qt.ToolTipRole])
+
+    def row(self, row):
+        """Liefert die Datenbankzeile (inkl. id) zur Tabellenzeile."""
+        return self._lookup(row)[0]
+
+    def _lookup(self, row):
+        """(Datenbankzeile, Warnungen je id) zur Tabellenzeile."""
+        if self._matches is not None:
+            return (self._matches[row] if row < len(self._matches) else None), self._match_alerts
+        page_no, offset = divmod(row, self.page_size)
+        entry = self._pages.get(page_no)
+        if entry is None:
+            page = get_entries_page(page_no * self.page_size, self.page_size, self.start, self.end,
+                                    self.order_by, self.descending)
+            entry = self._pages[page_no] = (page, get_alert_messages([r[0] for r in page]))
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_no)
+        page, messages = entry
+        return (page[offset] if offset < len(page) else None), messages
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ForegroundRole, Qt.ToolTipRole):
+            return None
+        row, messages = self._lookup(index.row())
+        if row is None:
+            return None
+        if role == Qt.DisplayRole:
+            return str(row[index.column() + 1])
+        message = messages.get(row[0])
+        if message is None:
+            return None
+        return ALERT_COLOR if role == Qt.ForegroundRole else message
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.order_by = SORT_COLUMNS[column]
+        self.descending = order == Qt.DescendingOrder
+        if self.search:
+            self.ranked = False
+        self.refresh()
+
+    def _sort_matches(self):
+        # Suchtreffer sind auf SEARCH_LIMIT begrenzt, daher reicht Sortieren in Python
+        col = SORT_COLUMNS.index(self.order_by) + 1
+        self._matches = sorted(self._matches, key=lambda r: (r[col] is None, "" if r[col] is None else r[col], r[0]),
+                               reverse=self.descending)
@@ -1,47 +1,151 @@
-import pandas as pd
-from database import get_all_entries
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+import csv
+import gzip
+import os
+from database import count_entries, get_watermark, insert_entries, iter_entries, set_watermark, transaction
+from perf import timed
 
-def export_to_csv(path):
-    data = get_all_entries()
-    df = pd.DataFrame(data, columns=["ID", "Datum", "Gewicht", "Zucker", "Schlaf", "Befinden", "Notizen"])
-    df.to_csv(path, index=False, encoding='utf-8')
+# pandas (CSV-Import) und reportlab (PDF) werden erst beim ersten Gebrauch importiert
 
+EXPORT_HEADERS = ["ID", "Datum", "Gewicht", "Zucker", "Schlaf", "Befinden", "Notizen"]
+EXPORT_CHUNK_SIZE = 5000
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def open_output(path, compress=None):
+    """Öffnet die Zieldatei als Text; gzip, wenn compress gesetzt ist oder der Name auf .gz endet."""
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6)
+    return open(path, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER_SIZE)
+
+
+@timed("export.export_to_csv", rows=int)
+def export_to_csv(path, start=None, end=None, compress=None, progress=None):
+    """Schreibt die Einträge blockweise als CSV; der Speicherbedarf hängt nicht von der Zeilenzahl ab.
+
+    start/end begrenzen den Zeitraum, progress wird nach jedem Block mit
+    (geschriebene Zeilen, Anteil 0..1) aufgerufen. Gibt die Zeilenzahl zurück.
+    """
+    total = count_entries(start, end) if progress else 0
+    written = 0
+    with open_output(path, compress) as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(EXPORT_HEADERS)
+        for rows in iter_entries(start, end, EXPORT_CHUNK_SIZE):
+            writer.writerows(rows)
+            written += len(rows)
+            if progress:
+                progress(written, written / total if total else 1.0)
+    return written
+
+# Spalten der CSV-Datei und ihre Entsprechung in health_entry
+CSV_COLUMNS = {
+    "Datum": "timestamp",
+    "Gewicht": "weight",
+    "Zucker": "blood_sugar",
+    "Schlaf": "sleep_hours",
+    "Befinden": "mood",
+    "Notizen": "notes",
+}
+NUMERIC_COLUMNS = ("weight", "blood_sugar", "sleep_hours")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+IMPORT_CHUNK_SIZE = 50000
+
+
+def _prepare_chunk(chunk):
+    """Prüft und konvertiert einen CSV-Block spaltenweise.
+
+    Gibt einen DataFrame mit den Spalten von health_entry zurück; Zeilen
+    ohne gültiges Datum werden verworfen, ungültige Zahlen werden zu NULL.
+    """
+    import pandas as pd
+    missing = [col for col in CSV_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Fehlende Spalten in CSV: {', '.join(missing)}")
+    df = chunk[list(CSV_COLUMNS)].rename(columns=CSV_COLUMNS)
+
+    raw = df["timestamp"].astype("string").str.strip()
+    ts = pd.to_datetime(raw, format=TIMESTAMP_FORMAT, errors="coerce")
+    retry = ts.isna() & raw.notna()
+    if retry.any():
+        # Abweichende Formate (z.B. mit Sekunden) einzeln nachparsen
+        ts[retry] = pd.to_datetime(raw[retry], format="ISO8601", errors="coerce")
+    df = df[ts.notna()].copy()
+    df["timestamp"] = ts[ts.notna()].dt.strftime(TIMESTAMP_FORMAT)
+
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    for col in ("mood", "notes"):
+        df[col] = df[col].fillna("").astype(str)
+    return df
+
+
+def iter_csv_chunks(path, chunksize=IMPORT_CHUNK_SIZE):
+    """Liest die CSV blockweise; liefert (DataFrame, gelesene Zeilen, Anteil der Datei)."""
+    import pandas as pd
+    size = os.path.getsize(path) or 1
+    with open(path, "rb") as f:
+        for chunk in pd.read_csv(f, chunksize=chunksize, dtype={"Datum": str, "Befinden": str, "Notizen": str}):
+            yield _prepare_chunk(chunk), len(chunk), min(f.tell() / size, 1.0)
+
+
+def default_source(path):
+    """Quelle eines Imports ohne Angabe: der Dateiname ohne Endung (z.B. "waage")."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+@timed("export.import_csv_file", rows=lambda r: r["rows_imported"])
+def import_csv_file(path, chunksize=IMPORT_CHUNK_SIZE, progress=None, source=None, full=False):
+    """Importiert eine CSV-Datei blockweise in einer einzigen Transaktion.
+
+    Einträge werden über (Zeitpunkt, Quelle) abgeglichen, ein erneuter
+    Import derselben Datei legt also nichts doppelt an. Zeilen bis zur
+    gespeicherten Marke der Quelle werden ohne Datenbankzugriff
+    übersprungen, sodass wiederholte Importe einer wachsenden Exportdatei
+    nur die neuen Zeilen schreiben; full=True gleicht alle Zeilen ab.
+
+    progress wird nach jedem Block mit (importierte Zeilen, Anteil 0..1)
+    aufgerufen. Gibt ein Dict mit rows_read, rows_imported (neu oder
+    geändert), rows_skipped und rows_known (vor der Marke) zurück.
+    """
+    source = source or default_source(path)
+    watermark = None if full else get_watermark(source)
+    rows_read = rows_imported = rows_known = 0
+    newest = None
+    with transaction() as conn:
+        for df, count, fraction in iter_csv_chunks(path, chunksize):
+            rows_read += count
+            if watermark is not None:
+                new = df["timestamp"] > watermark  # Textvergleich, Format ist sortierbar
+                rows_known += len(df) - int(new.sum())
+                df = df[new]
+            if len(df):
+                latest = df["timestamp"].max()
+                newest = latest if newest is None else max(newest, latest)
+                rows_imported += insert_entries(df.itertuples(index=False, name=None), conn, source)
+            if progress:
+                progress(rows_imported, fraction)
+        if newest is not None:
+            set_watermark(source, newest, conn)
+    return {
+        "rows_read": rows_read,
+        "rows_imported": rows_imported,
+        "rows_skipped": rows_read - rows_imported,
+        "rows_known": rows_known,
+        "source": source,
+    }
+
+
+@timed("export.import_from_csv", rows=len)
 def import_from_csv(path):
-    df = pd.read_csv(path)
     entries = []
-    for _, row in df.iterrows():
-        entries.append({
-            "timestamp": row["Datum"],
-            "weight": row["Gewicht"],
-            "blood_sugar": row["Zucker"],
-            "sleep_hours": row["Schlaf"],
-            "mood": row["Befinden"],
-            "notes": row["Notizen"]
-        })
+    for df, _, _ in iter_csv_chunks(path):
+        entries.extend(df.to_dict("records"))
     return entries
 
-def export_to_pdf(path):
-    data = get_all_entries()
-    c = canvas.Canvas(path, pagesize=A4)
-    width, height = A4
-    y = height - 40
-    c.setFont("Helvetica", 10)
-    c.drawString(50, y, "Health Tracker Export")
-    y -= 20
-
-    headers = ["Datum", "Gewicht", "Zucker", "Schlaf", "Befinden", "Notizen"]
-    for header in headers:
-        c.drawString(50 + headers.index(header) * 80, y, header)
-    y -= 20
-
-    for row in data:
-        for i, val in enumerate(row[1:]):
-            c.drawString(50 + i * 80, y, str(val))
-        y -= 20
-        if y < 40:
-            c.showPage()
-            y = height - 40
-
-    c.save()
\ No newline at end of file
+
+@timed("export.export_to_pdf", rows=int)
+def export_to_pdf(path, start=None, end=None, height_cm=0, summary_only=False, progress=None):
+    from report import export_report
+    return export_report(path, start, end, height_cm=height_cm, summary_only=summary_only, progress=progress)
@@ -0,0 +1,326 @@
+"""Lokaler HTTP/JSON-Dienst, über den Messgeräte und Skripte Messwerte einliefern.
+
+    python ingest.py --port 8765 --db health_data.db
+
+    curl -X POST localhost:8765/readings \\
+         -d '{"timestamp": "2025-01-01 08:00", "blood_sugar": 104, "source": "meter"}'
+
+POST /readings nimmt ein Objekt oder eine Liste von Objekten mit den Feldern
+timestamp (ISO-Format, Standard: jetzt), weight, blood_sugar, sleep_hours,
+mood, notes und source entgegen und antwortet mit 202, sobald sie in der
+Warteschlange stehen. GET /status liefert Zähler und Füllstand.
+
+Geschrieben wird von genau einem Thread in Stapeln (eine Transaktion pro
+Stapel, Upsert über Zeitpunkt und Quelle); mehrere Werte für denselben
+Schlüssel innerhalb eines Stapels werden zusammengefasst. Ist die
+Warteschlange voll, antwortet der Dienst mit 503 und Retry-After.
+"""
+import argparse
+import asyncio
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import database
+from perf import timed
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Messwerte, die höchstens auf das Schreiben warten
+QUEUE_SIZE = 50000
+# Höchstens so viele Messwerte pro Transaktion
+BATCH_SIZE = 5000
+# So lange wird nach dem ersten Messwert auf weitere gewartet (Sekunden)
+FLUSH_INTERVAL = 0.2
+MAX_BODY_SIZE = 4 * 1024 * 1024
+DEFAULT_SOURCE = "api"
+NUMERIC_FIELDS = ("weight", "blood_sugar", "sleep_hours")
+# Schlüssel (timestamp, source) der in einem Stapel neu eingefügten Zeilen
+NEW_KEYS_SQL = f"SELECT {database.TS_TO_TEXT.format('ts')}, source FROM entry WHERE id > ?"
+
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+           413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class ReadingError(ValueError):
+    """Ungültiger Messwert in einer Anfrage."""
+
+
+class RequestError(Exception):
+    """Anfrage nicht lesbar; wird mit status beantwortet, danach wird die Verbindung geschlossen."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_reading(obj):
+    """Prüft einen Messwert und gibt (timestamp, source, Werte-Tupel für insert_entries) zurück."""
+    if not isinstance(obj, dict):
+        raise ReadingError("Messwert muss ein JSON-Objekt sein")
+    value = obj.get("timestamp")
+    try:
+        ts = datetime.now() if value is None else datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ReadingError(f"Ungültiger Zeitstempel: {value!r}") from None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone().replace(tzinfo=None)  # in Ortszeit speichern wie das Formular
+    numbers = []
+    for field in NUMERIC_FIELDS:
+        number = obj.get(field)
+        if number is not None and (isinstance(number, bool) or not isinstance(number, (int, float))):
+            raise ReadingError(f"{field} muss eine Zahl sein")
+        if number is not None and not math.isfinite(number):
+            # json.loads akzeptiert NaN und Infinity
+            raise ReadingError(f"{field} muss eine endliche Zahl sein")
+        numbers.append(None if number is None else float(number))
+    if all(number is None for number in numbers):
+        raise ReadingError("Kein Messwert (weight, blood_sugar oder sleep_hours)")
+    timestamp = ts.strftime(database.TIMESTAMP_FORMAT)
+    source = str(obj.get("source") or DEFAULT_SOURCE)
+    return timestamp, source, (timestamp, *numbers, str(obj.get("mood") or ""), str(obj.get("notes") or ""))
+
+
+@timed("ingest.write_batch", rows=lambda r: r["rows"])
+def write_batch(readings):
+    """Schreibt einen Stapel in einer Transaktion; läuft im Writer-Thread.
+
+    readings ist ein Dict (timestamp, source) -> Werte-Tupel. Gibt rows,
+    inserted, updated und entries (die Werte-Tupel der neu eingefügten
+    Zeilen, zum Anhängen im Diagramm) zurück; unveränderte Werte fehlen dort.
+    """
+    by_source = {}
+    for (_, source), row in readings.items():
+        by_source.setdefault(source, []).append(row)
+    with database.transaction() as conn:
+        max_id = conn.execute("SELECT coalesce(MAX(id), 0) FROM entry").fetchone()[0]
+        changed = sum(database.insert_entries(rows, conn, source) for source, rows in by_source.items())
+        new = set(conn.execute(NEW_KEYS_SQL, (max_id,)).fetchall())
+    return {"rows": len(readings), "inserted": len(new), "updated": changed - len(new),
+            "entries": [row for key, row in readings.items() if key in new]}
+
+
+class IngestServer:
+    """asyncio-Server in einem eigenen Thread mit Warteschlange und einem Writer-Thread.
+
+    on_flush wird nach jedem geschriebenen Stapel im Writer-Thread mit dem
+    Ergebnis von write_batch() aufgerufen (in der GUI über ein Qt-Signal
+    weitergereicht).
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, queue_size=QUEUE_SIZE,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, on_flush=None):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.stats = {"received": 0, "rejected": 0, "written": 0, "batches": 0, "last_flush_ms": 0.0}
+        self.error = None
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._stopping = None
+        self._clients = set()
+        self._handlers = set()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer")
+
+    # Steuerung aus anderen Threads
+
+    def start(self):
+        """Startet den Dienst im Hintergrund; wirft OSError, wenn der Port belegt ist."""
+        self._thread = threading.Thread(target=self._run, name="ingest", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def stop(self, timeout=10):
+        """Nimmt keine Anfragen mehr an, schreibt die Warteschlange leer und beendet den Dienst."""
+        if self._loop is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stopping.set)
+            self._thread.join(timeout)
+        self._writer.submit(database.close_connection).result()
+        self._writer.shutdown()
+
+    def serve_forever(self):
+        """Blockierend im aktuellen Thread (Kommandozeile)."""
+        try:
+            asyncio.run(self._main())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._writer.submit(database.close_connection).result()
+            self._writer.shutdown()
+
+    def _run(self):
+        try:
+            asyncio.run(self._main())
+        except OSError as e:
+            self.error = e
+            self._ready.set()
+
+    # Innerhalb der Ereignisschleife
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self.queue = asyncio.Queue(self.queue_size)
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]  # bei port=0 der zugewiesene
+        self._ready.set()
+        flusher = asyncio.create_task(self._flush_loop())
+        async with server:
+            await self._stopping.wait()
+            server.close()
+            for client in list(self._clients):  # offene Keep-Alive-Verbindungen
+                client.close()
+            # Auf die Handler warten: nach close() liefert readline() EOF. Sonst bricht
+            # asyncio.run() sie ab und meldet den CancelledError als Traceback.
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await server.wait_closed()
+        await self.queue.join()
+        flusher.cancel()
+
+    async def _flush_loop(self):
+        while True:
+            first = await self.queue.get()
+            batch = {first[:2]: first[2]}
+            taken = 1
+            deadline = self._loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    if self.queue.empty():
+                        timeout = deadline - self._loop.time()
+                        if timeout <= 0:
+                            break
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    else:
+                        item = self.queue.get_nowait()
+                except asyncio.TimeoutError:
+                    break
+                batch[item[:2]] = item[2]  # gleicher Zeitpunkt und Quelle: letzter Wert gilt
+                taken += 1
+            start = time.perf_counter()
+            try:
+                result = await self._loop.run_in_executor(self._writer, write_batch, batch)
+            except Exception as e:  # Stapel verwerfen, Dienst läuft weiter
+                print(f"ingest: Stapel mit {len(batch)} Werten nicht geschrieben: {e}")
+                result = None
+            for _ in range(taken):
+                self.queue.task_done()
+            if result is None:
+                continue
+            self.stats["written"] += result["rows"]
+            self.stats["batches"] += 1
+            self.stats["last_flush_ms"] = (time.perf_counter() - start) * 1000
+            if self.on_flush is not None:
+                self.on_flush(result)
+
+    async def _handle(self, reader, writer):
+        self._clients.add(writer)
+        self._handlers.add(asyncio.current_task())
+        try:
+            while not self._stopping.is_set():
+                try:
+                    request = await self._read_request(reader)
+                except RequestError as e:
+                    self.stats["rejected"] += 1
+                    self._respond(writer, e.status, {"error": str(e)}, {}, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+                status, payload, headers = self._dispatch(method, path, body)
+                self._respond(writer, status, payload, headers, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, path, version = line.decode("latin-1").split()
+        except ValueError:
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise RequestError(400, f"Ungültige Content-Length: {headers['content-length']!r}")
+        if length > MAX_BODY_SIZE:
+            raise RequestError(413, f"Anfrage größer als {MAX_BODY_SIZE} Bytes")
+        body = await reader.readexactly(length) if length else b""
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method, path, body, keep_alive
+
+    def _dispatch(self, method, path, body):
+        path = path.split("?", 1)[0]
+        if method == "GET" and path == "/status":
+            return 200, dict(self.stats, queued=self.queue.qsize(), capacity=self.queue_size), {}
+        if method != "POST" or path != "/readings":
+            return 404, {"error": "Nur POST /readings und GET /status"}, {}
+        try:
+            data = json.loads(body or b"null")
+            readings = [parse_reading(obj) for obj in (data if isinstance(data, list) else [data])]
+        except (ValueError, ReadingError) as e:
+            self.stats["rejected"] += 1
+            return 400, {"error": str(e)}, {}
+        if self.queue_size - self.queue.qsize() < len(readings):
+            # Ganz oder gar nicht, damit Clients die Anfrage einfach wiederholen können
+            self.stats["rejected"] += len(readings)
+            return 503, {"error": "Warteschlange voll"}, {"Retry-After": "1"}
+        for reading in readings:
+            self.queue.put_nowait(reading)
+        self.stats["received"] += len(readings)
+        return 202, {"accepted": len(readings)}, {}
+
+    @staticmethod
+    def _respond(writer, status, payload, headers, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Type: application/json; charset=utf-8",
+                 f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default=database.DB_FILE)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    database.DB_FILE = args.db
+    database.init_db()
+
+    def report(result):
+        print(f"{result['rows']} Werte geschrieben ({result['inserted']} neu, {result['updated']} geändert)")
+
+    server = IngestServer(args.host, args.port, batch_size=args.batch_size, on_flush=report)
+    print(f"Annahme auf http://{args.host}:{args.port}/readings (Strg+C beendet)")
+    server.serve_forever()
@@ -1,19 +1,70 @@
+import time
+STARTUP_T0 = time.perf_counter()
+
 import sys
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QFormLayout, QLineEdit,
-    QPushButton, QComboBox, QDateTimeEdit, QTextEdit, QTableWidget, QTableWidgetItem,
-    QFileDialog, QLabel, QHBoxLayout
+    QPushButton, QComboBox, QDateTimeEdit, QTextEdit, QTableView,
+    QFileDialog, QLabel, QHBoxLayout, QProgressBar, QMessageBox, QMenu
 )
-from PySide6.QtCore import Qt, QDateTime
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from database import init_db, insert_entry, get_all_entries
-from export import export_to_csv, import_from_csv, export_to_pdf
-from datetime import datetime
+from PySide6.QtCore import Qt, QDateTime, QObject, QTimer, Signal
+from startup import StartupProfile
+STARTUP = StartupProfile(STARTUP_T0)
+STARTUP.mark("Import PySide6")
+from database import (init_db, insert_entry, entry_exists, get_averages, to_timestamp, close_all_connections,
+                      INSERTED, UNCHANGED)
+from entry_model import EntryTableModel
+from tasks import Task, TaskRunner
+from perf import timed
+from datetime import datetime, timedelta
 import json
 import os
+import sqlite3
+STARTUP.mark("Import App-Module")
+
+# matplotlib, numpy, pandas und reportlab werden erst bei Bedarf geladen:
+# Diagramm nach dem ersten Anzeigen des Fensters, Export/Import beim ersten Klick.
 
 SETTINGS_FILE = "settings.json"
+# Standard-Zeitfenster für Tabelle und Diagramm (0 = komplette Historie)
+DEFAULT_WINDOW_DAYS = 90
+# Wartezeit nach der letzten Eingabe im Suchfeld
+SEARCH_DELAY_MS = 250
+# Tabelle und Diagramm höchstens so oft nach eingelieferten Messwerten aktualisieren
+INGEST_REFRESH_MS = 500
+# Alte Einträge erst verdichten, wenn der Start abgeschlossen ist (siehe retention.py)
+RETENTION_DELAY_MS = 30000
+# Automatische Sicherung (backup_interval_hours) danach, damit sich beide nicht abwechseln
+BACKUP_DELAY_MS = 60000
+
+
+class IngestSignals(QObject):
+    flushed = Signal(object)   # Ergebnis von ingest.write_batch(), aus dem Writer-Thread
+
+
+def latest_daily_average(start=None, height_cm=0, task=None):
+    from analytics import load_snapshot, summarize, summary_lines
+    days = get_averages("day", limit=1, newest_first=True)
+    if not days:
+        return None
+    latest = days[0]
+
+    def fmt(value, unit):
+        return f"{value:.1f} {unit}" if value is not None else "-"
+
+    text = (f"Durchschnitt {latest['period']}:\nGewicht: {fmt(latest['weight_avg'], 'kg')}\n"
+            f"Zucker: {fmt(latest['sugar_avg'], 'mg/dL')}\nSchlaf: {fmt(latest['sleep_avg'], 'h')}")
+    weeks = get_averages("week", limit=4, newest_first=True)
+    if len(weeks) > 1:
+        text += "\n\nWochendurchschnitte:"
+        for week in weeks:
+            text += (f"\nab {week['period']}: {fmt(week['weight_avg'], 'kg')}, "
+                     f"{fmt(week['sugar_avg'], 'mg/dL')}")
+    lines = summary_lines(summarize(load_snapshot(start), height_cm))
+    if lines:
+        text += "\n\nStatistik (Zeitfenster):\n" + "\n".join(lines)
+    return text
+
 
 class HealthTracker(QWidget):
     def __init__(self):
@@ -21,12 +72,33 @@ class HealthTracker(QWidget):
         self.setWindowTitle("Erics Diet-Logger 2025")
         self.setStyleSheet("background-color: #2b2b2b; color: white;")
         self.setMinimumSize(900, 700)
-        init_db()
-
         self.settings = self.load_user_settings()
+        try:
+            init_db()
+        except sqlite3.DatabaseError as e:
+            if not self.recover_database(e):
+                raise
+        STARTUP.mark("init_db")
+        self.tasks = TaskRunner(self)
+        self.load_task = None
+        self.alerts_task = None
+        self.alerts_pending = False
+
         self.user_height_cm = self.settings.get("height_cm", 0)
+        self.window_days = self.settings.get("window_days", DEFAULT_WINDOW_DAYS)
         self.init_ui()
-        
+        STARTUP.mark("init_ui")
+        self.ingest = None
+        self.ingest_pending = []
+        if self.settings.get("ingest_port"):
+            self.start_ingest(self.settings["ingest_port"])
+        if self.settings.get("retention_months"):
+            QTimer.singleShot(RETENTION_DELAY_MS, self.apply_retention)
+        if self.settings.get("backup_interval_hours"):
+            QTimer.singleShot(BACKUP_DELAY_MS, self.auto_backup)
+        # Diagramm erst aufbauen, wenn die Ereignisschleife läuft (Fenster ist sichtbar)
+        QTimer.singleShot(0, self.init_chart)
+        QTimer.singleShot(0, self.check_alerts)
 
     def load_user_settings(self):
         if os.path.exists(SETTINGS_FILE):
@@ -34,7 +106,27 @@ class HealthTracker(QWidget):
                 return json.load(f)
         return {}
 
-    def save_user_settings(settings):
+    def recover_database(self, error):
+        """Bietet beim Start an, eine unlesbare Datenbank aus einer Sicherung wiederherzustellen."""
+        from backup import BackupError, backup_dir, prepare_restore, swap_in
+        from database import DB_FILE
+        answer = QMessageBox.question(self, "Datenbank beschädigt", f"{DB_FILE} lässt sich nicht öffnen ({error}).\n"
+                                      "Aus einer Sicherung wiederherstellen?")
+        if answer != QMessageBox.Yes:
+            return False
+        path, _ = QFileDialog.getOpenFileName(self, "Sicherung wiederherstellen",
+                                              self.settings.get("backup_dir") or backup_dir(),
+                                              "Sicherungen (*.db *.db.gz)")
+        if not path:
+            return False
+        try:
+            swap_in(prepare_restore(path))  # Fenster ist noch nicht sichtbar, kein Hintergrund nötig
+        except (BackupError, OSError) as e:
+            QMessageBox.warning(self, "Wiederherstellen", str(e))
+            return False
+        return True
+
+    def save_user_settings(self, settings):
         with open(SETTINGS_FILE, "w") as f:
             json.dump(settings, f)
 
@@ -79,16 +171,46 @@ class HealthTracker(QWidget):
         button_layout.addWidget(import_button)
         button_layout.addWidget(pdf_button)
         button_layout.addWidget(average_button)
-
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["Datum", "Gewicht", "Zucker", "Schlaf", "Befinden", "Bemerkung"])
+        self.alerts_button = QPushButton("Warnungen")
+        self.alerts_button.clicked.connect(self.show_alerts)
+        button_layout.addWidget(self.alerts_button)
+        self.alerts_panel = None
+        backup_button = QPushButton("Sicherung")
+        backup_menu = QMenu(backup_button)
+        backup_menu.addAction("Jetzt sichern", self.create_backup)
+        backup_menu.addAction("Wiederherstellen ...", self.restore_backup)
+        backup_button.setMenu(backup_menu)
+        button_layout.addWidget(backup_button)
+        diagnostics_button = QPushButton("Diagnose")
+        diagnostics_button.clicked.connect(self.show_diagnostics)
+        button_layout.addWidget(diagnostics_button)
+        self.perf_panel = None
+
+        self.table_model = EntryTableModel(parent=self)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Bemerkungen durchsuchen (gesamte Historie) ...")
+        self.search_input.setClearButtonEnabled(True)
+        # Suche erst, wenn SEARCH_DELAY_MS lang nicht getippt wurde
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.search_input.textChanged.connect(lambda _text: self.search_timer.start())
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(0, Qt.AscendingOrder)
         self.table.setStyleSheet("background-color: #3c3f41; color: white;")
 
-        #self.canvas = FigureCanvas(Figure(figsize=(5, 3)))
-        #self.ax = self.canvas.figure.subplots()
-        self.fig = Figure(figsize=(8, 6))
-        self.canvas = FigureCanvas(self.fig)
+        # Platzhalter, bis init_chart() den Matplotlib-Canvas erzeugt
+        self.fig = None
+        self.canvas = None
+        self.chart = None
+        self.chart_layout = QVBoxLayout()
+        self.chart_placeholder = QLabel("Diagramm wird geladen ...")
+        self.chart_placeholder.setMinimumHeight(400)
+        self.chart_placeholder.setAlignment(Qt.AlignCenter)
+        self.chart_layout.addWidget(self.chart_placeholder)
 
         self.weight_input.textChanged.connect(self.update_bmi)
         self.height_input.textChanged.connect(self.update_bmi)
@@ -97,10 +219,26 @@ class HealthTracker(QWidget):
         layout.addLayout(form_layout)
         layout.addWidget(save_button)
         layout.addLayout(button_layout)
-        layout.addWidget(QLabel("Einträge:"))
+        entries_header = QHBoxLayout()
+        entries_header.addWidget(QLabel("Einträge:"))
+        entries_header.addWidget(self.search_input)
+        layout.addLayout(entries_header)
         layout.addWidget(self.table)
         layout.addWidget(QLabel("Diagramm:"))
-        layout.addWidget(self.canvas)
+        layout.addLayout(self.chart_layout)
+
+        # Fortschritt laufender Hintergrundaufgaben
+        status_layout = QHBoxLayout()
+        self.status_label = QLabel("")
+        self.progress_bar = QProgressBar()
+        self.cancel_button = QPushButton("Abbrechen")
+        self.cancel_button.clicked.connect(self.tasks.cancel_all)
+        status_layout.addWidget(self.status_label)
+        status_layout.addWidget(self.progress_bar)
+        status_layout.addWidget(self.cancel_button)
+        layout.addLayout(status_layout)
+        self.tasks.done.connect(self.update_task_status)
+        self.update_task_status()
 
         self.setLayout(layout)
         self.load_entries()
@@ -111,6 +249,21 @@ class HealthTracker(QWidget):
        
 
 
+    def init_chart(self):
+        STARTUP.mark("Fenster angezeigt")
+        from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        from charts import ChartController
+        STARTUP.mark("Import matplotlib/numpy")
+
+        self.fig = Figure(figsize=(8, 6))
+        self.canvas = FigureCanvas(self.fig)
+        self.chart = ChartController(self.fig, self.canvas)
+        self.chart_layout.replaceWidget(self.chart_placeholder, self.canvas)
+        self.chart_placeholder.deleteLater()
+        STARTUP.mark("Canvas erzeugt")
+        self.load_entries()
+
     def update_bmi(self):
         try:
             weight = float(self.weight_input.text())
@@ -147,9 +300,11 @@ class HealthTracker(QWidget):
                 "mood": self.mood_input.currentText(),
                 "notes": self.notes_input.toPlainText()
             }
-            insert_entry(entry)
-            self.load_entries()
-            self.clear_form()
+            if entry_exists(entry["timestamp"]) and QMessageBox.question(
+                    self, "Eintrag ersetzen",
+                    f"Für {entry['timestamp']} gibt es schon einen Eintrag. Ersetzen?") != QMessageBox.Yes:
+                return
+            status = insert_entry(entry)
             # Körpergröße speichern
             try:
                 self.user_height_cm = float(self.height_input.text())
@@ -157,133 +312,250 @@ class HealthTracker(QWidget):
                 self.save_user_settings(self.settings)
             except ValueError:
                 pass
+            self.add_entry_to_views(entry, status)
+            self.clear_form()
         except ValueError:
-            from PySide6.QtWidgets import QMessageBox
             QMessageBox.warning(self, "Fehler", "Bitte gib gültige Zahlen ein.")
 
+    def window_start(self):
+        if not self.window_days or self.window_days <= 0:
+            return None
+        return datetime.now() - timedelta(days=self.window_days)
+
+    def run_task(self, name, func, *args, on_finished=None, on_stopped=None, **kwargs):
+        """Startet func im Hintergrund und zeigt den Fortschritt in der Statuszeile.
+
+        on_stopped() wird nach einem Fehler (nach der Meldung) oder Abbruch aufgerufen.
+        """
+        task = Task(name, func, *args, **kwargs)
+        self.status_label.setText(f"{name} ...")
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.cancel_button.show()
+
+        def failed(msg):
+            QMessageBox.warning(self, "Fehler", msg)
+            if on_stopped:
+                on_stopped()
+
+        return self.tasks.start(task, on_finished=on_finished, on_failed=failed, on_cancelled=on_stopped,
+                                on_progress=lambda rows, fraction: self.show_progress(task, rows, fraction))
+
+    def show_progress(self, task, rows, fraction):
+        if fraction < 0:
+            self.progress_bar.setRange(0, 0)
+        else:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(int(fraction * 100))
+        self.status_label.setText(f"{task.name}: {rows} Zeilen")
+
+    def update_task_status(self, task=None):
+        if not self.tasks.active:
+            self.status_label.setText("")
+            self.progress_bar.hide()
+            self.cancel_button.hide()
+
+    @timed("gui.load_entries")
     def load_entries(self):
-        self.fig.clf()  # Alte Plots löschen
-        data = get_all_entries()
-        self.table.setRowCount(len(data))
-
-        dates, weights, sugars, bmis = [], [], [], []
-
-        for row_idx, row in enumerate(data):
-            for col_idx, value in enumerate(row[1:7]):
-                self.table.setItem(row_idx, col_idx, QTableWidgetItem(str(value)))
-
-            dt = datetime.strptime(row[1], "%Y-%m-%d %H:%M")
-            dates.append(dt)
-            weights.append(row[2])
-            sugars.append(row[3])
-
-            if hasattr(self, 'user_height_cm') and self.user_height_cm > 0:
-                height_m = self.user_height_cm / 100.0
-                bmi = row[2] / (height_m ** 2)
-                bmis.append(bmi)
-            else:
-                bmis.append(None)
-
-        # Subplots erzeugen (3 Zeilen, 1 Spalte)
-        axs = self.fig.subplots(3, 1, sharex=True)
-
-        # Subplot 1: Gewicht
-        axs[0].plot(dates, weights, color='blue', label="Gewicht (kg)")
-        axs[0].set_ylabel("Gewicht (kg)")
-        axs[0].legend()
-        axs[0].grid(True)
-
-        # Subplot 2: Blutzucker
-        axs[1].plot(dates, sugars, color='green', label="Zucker (mg/dL)")
-        axs[1].set_ylabel("Zucker (mg/dL)")
-        axs[1].legend()
-        axs[1].grid(True)
-
-        # Subplot 3: BMI (wenn vorhanden)
-        if any(bmis):
-            axs[2].plot(dates, bmis, color='orange', linestyle='--', label="BMI")
-            axs[2].set_ylabel("BMI")
-            axs[2].grid(True)
-            axs[2].legend()
-
-            if self.user_height_cm:
-                ideal_min = 18.5
-                ideal_max = 24.9
-                axs[2].axhspan(ideal_min, ideal_max, color='green', alpha=0.1, label="BMI Idealbereich")
-                axs[2].legend()
-
-        axs[2].set_xlabel("Datum")
-
-        self.fig.tight_layout()
-        self.canvas.draw()
-
-    def load_entries1(self):
-        self.ax.clear()
-        data = get_all_entries()
-        self.table.setRowCount(len(data))
-        dates, weights, sugars = [], [], []
-        bmis = []
-        for row_idx, row in enumerate(data):
-            for col_idx, value in enumerate(row[1:7]):
-                self.table.setItem(row_idx, col_idx, QTableWidgetItem(str(value)))
-
-            dt = datetime.strptime(row[1], "%Y-%m-%d %H:%M")
-            dates.append(dt)
-            weights.append(row[2])
-            sugars.append(row[3])
-
-            # BMI berechnen, wenn Größe bekannt
-            if hasattr(self, 'user_height_cm') and self.user_height_cm > 0:
-                height_m = self.user_height_cm / 100.0
-                bmi = row[2] / (height_m ** 2)
-                bmis.append(bmi)
-            else:
-                bmis.append(None)
-
-     
-        color1 = 'blue'
-        color2 = 'green'
-        color3 = 'orange'
-
-        ax1 = self.ax
-        ax2 = ax1.twinx()
-
-        ax1.plot(dates, weights, color=color1, label="Gewicht (kg)")
-        ax2.plot(dates, sugars, color=color2, label="Zucker (mg/dL)")
-
-        # BMI als dritte Linie (falls vorhanden)
-        if any(bmis):
-            ax1.plot(dates, bmis, color=color3, linestyle="--", label="BMI")
-
-        ax1.set_ylabel("Gewicht / BMI", color=color1)
-        ax2.set_ylabel("Zucker (mg/dL)", color=color2)
-
-        ax1.tick_params(axis='y', labelcolor=color1)
-        ax2.tick_params(axis='y', labelcolor=color2)
-
-        ax1.set_title("Verlauf von Gewicht, Zucker & BMI")
-        ax1.legend(loc="upper left")
-        # Idealbereich für BMI
-        if self.user_height_cm:
-            ideal_min = 18.5
-            ideal_max = 24.9
-            ax1.axhspan(ideal_min, ideal_max, color='green', alpha=0.1, label="BMI Idealbereich")
+        start = self.window_start()
+        self.table_model.set_range(start)
+        if self.chart is None:
+            return  # init_chart() lädt die Daten nach
+        from charts import load_series
+        if self.load_task is not None:
+            self.load_task.cancel()
+        task = self.run_task("Laden", load_series, start, on_finished=self.show_series,
+                             on_stopped=lambda: self.load_stopped(task))
+        self.load_task = task
+
+    def start_ingest(self, port):
+        """Startet den lokalen Annahmedienst für Messgeräte (siehe ingest.py)."""
+        from ingest import IngestServer
+        self.ingest_signals = IngestSignals(self)
+        self.ingest_signals.flushed.connect(self.ingest_flushed)
+        self.ingest_timer = QTimer(self)
+        self.ingest_timer.setSingleShot(True)
+        self.ingest_timer.setInterval(INGEST_REFRESH_MS)
+        self.ingest_timer.timeout.connect(self.apply_ingest)
+        try:
+            self.ingest = IngestServer(port=port, on_flush=self.ingest_signals.flushed.emit).start()
+        except OSError as e:
+            self.ingest = None
+            QMessageBox.warning(self, "Messwert-Annahme", f"Port {port} nicht verfügbar: {e}")
+
+    def ingest_flushed(self, result):
+        self.ingest_pending.append(result)
+        if not self.ingest_timer.isActive():
+            self.ingest_timer.start()
+
+    @timed("gui.apply_ingest")
+    def apply_ingest(self):
+        """Übernimmt alle seit der letzten Aktualisierung eingelieferten Messwerte."""
+        results, self.ingest_pending = self.ingest_pending, []
+        if any(r["updated"] for r in results) or self.chart is None or self.load_task is not None:
+            # Geänderte Werte lassen sich nicht anhängen; neu laden (über den Spalten-Cache)
+            self.load_entries()
+        else:
+            self.table_model.refresh()
+            start = self.window_start()
+            start = to_timestamp(start) if start is not None else None
+            entries = [e for r in results for e in r["entries"] if start is None or e[0] >= start]
+            if entries:
+                ts, weights, sugars = list(zip(*entries))[:3]
+                self.chart.append_many(ts, weights, sugars)
+        self.check_alerts()
+        rows = sum(r["rows"] for r in results)
+        if not self.tasks.active:
+            self.status_label.setText(f"{rows} Messwerte empfangen ({datetime.now():%H:%M:%S})")
+
+    def apply_retention(self):
+        """Verdichtet alte Einträge im Hintergrund nach der Regel in settings.json."""
+        from retention import apply_policy, policy_from_settings
+        try:
+            policy = policy_from_settings(self.settings)
+        except ValueError as e:
+            QMessageBox.warning(self, "Aufbewahrung", str(e))
+            return
+        if policy:
+            self.run_task("Verdichten", lambda months, resolution, task: apply_policy(
+                months, resolution, progress=task.progress), *policy, on_finished=self.retention_finished)
 
-        self.canvas.draw()
+    def retention_finished(self, result):
+        if result["rows_removed"]:
+            self.load_entries()
+            self.check_alerts()
 
+    def check_alerts(self):
+        """Prüft neue Einträge im Hintergrund auf Warnungen (siehe alerts.py)."""
+        if self.alerts_task in self.tasks.active:
+            self.alerts_pending = True  # nach dem laufenden Durchgang noch einmal
+            return
+        from alerts import evaluate
+        self.alerts_pending = False
+        self.alerts_task = self.run_task("Warnungen prüfen", lambda task: evaluate(progress=task.progress),
+                                         on_finished=self.alerts_checked)
+
+    def alerts_checked(self, result):
+        if result["alerts"]:
+            self.show_alert_count()
+        if self.alerts_pending:
+            QTimer.singleShot(0, self.check_alerts)
+
+    def show_alert_count(self):
+        from database import get_alerts
+        count = len(get_alerts())
+        self.alerts_button.setText(f"Warnungen ({count})" if count else "Warnungen")
+        self.table_model.refresh_alerts()
+        if self.alerts_panel is not None and self.alerts_panel.isVisible():
+            self.alerts_panel.refresh()
+
+    def auto_backup(self):
+        """Sichert im Hintergrund, wenn die letzte Sicherung älter als backup_interval_hours ist."""
+        from backup import list_backups
+        backups = list_backups(self.settings.get("backup_dir"))
+        if not backups or datetime.now() - backups[-1][0] >= timedelta(hours=self.settings["backup_interval_hours"]):
+            self.create_backup(report=False)
+
+    def create_backup(self, report=True):
+        """Sichert die Datenbank im Hintergrund (siehe backup.py)."""
+        from backup import DEFAULT_KEEP, create_backup
+        self.run_task("Sichern", lambda directory, keep, task: create_backup(directory, keep, progress=task.progress),
+                      self.settings.get("backup_dir"), self.settings.get("backup_keep", DEFAULT_KEEP),
+                      on_finished=self.backup_finished if report else None)
+
+    def backup_finished(self, result):
+        QMessageBox.information(self, "Sicherung", f"Gesichert nach {result['path']} ({result['bytes'] / 1e6:.1f} MB)"
+                                + (f", {result['removed']} ältere Sicherung(en) gelöscht" if result["removed"] else ""))
+
+    def restore_backup(self):
+        from backup import backup_dir, prepare_restore
+        path, _ = QFileDialog.getOpenFileName(self, "Sicherung wiederherstellen",
+                                              self.settings.get("backup_dir") or backup_dir(),
+                                              "Sicherungen (*.db *.db.gz)")
+        if not path:
+            return
+        answer = QMessageBox.question(self, "Wiederherstellen", f"Alle Einträge durch die Sicherung "
+                                      f"{os.path.basename(path)} ersetzen?\n(Die bisherige Datenbank bleibt als .bak erhalten.)")
+        if answer == QMessageBox.Yes:
+            self.run_task("Sicherung prüfen", lambda path, task: prepare_restore(path, progress=task.progress), path,
+                          on_finished=self.swap_in_backup)
+
+    def swap_in_backup(self, tmp):
+        """Tauscht die geprüfte Sicherung ein; Hintergrundaufgaben und Messwert-Annahme ruhen dabei."""
+        from backup import BackupError, swap_in
+        if self.ingest is not None:
+            self.ingest.stop()
+            self.ingest = None
+        self.tasks.cancel_all()
+        self.tasks.wait()
+        self.load_task = None
+        try:
+            swap_in(tmp)
+        except (BackupError, OSError) as e:
+            QMessageBox.warning(self, "Wiederherstellen", str(e))
+        if self.settings.get("ingest_port"):
+            self.start_ingest(self.settings["ingest_port"])
+        self.load_entries()
+        self.show_alert_count()
+        self.check_alerts()
+
+    @timed("gui.search")
+    def apply_search(self):
+        self.table_model.set_search(self.search_input.text())
+        self.table.scrollToTop()
+
+    def load_stopped(self, task):
+        """Ladevorgang fehlgeschlagen oder abgebrochen; ein neuerer bleibt eingetragen."""
+        if self.load_task is task:
+            self.load_task = None
+
+    @timed("gui.show_series")
+    def show_series(self, series):
+        self.load_task = None
+        weights, sugars = series
+        self.chart.set_series(weights, sugars, self.user_height_cm)
+        STARTUP.mark("Erstes Diagramm", final=True)
+
+    @timed("gui.add_entry")
+    def add_entry_to_views(self, entry, status=INSERTED):
+        """Aktualisiert Tabelle und Diagramm nach einem einzelnen gespeicherten Eintrag."""
+        if status == UNCHANGED:
+            return
+        self.check_alerts()
+        if status != INSERTED or self.load_task is not None:
+            # Ersetzter Eintrag bzw. ein laufender Ladevorgang kennt den Eintrag evtl. noch nicht
+            self.load_entries()
+            return
+        self.table_model.refresh()
+        if self.chart is None:
+            return
+        start = self.window_start()
+        if start is None or entry["timestamp"] >= to_timestamp(start):
+            self.chart.append(entry["timestamp"], entry["weight"], entry["blood_sugar"])
+        self.chart.set_height(self.user_height_cm)
 
     def export_csv(self):
-        path, _ = QFileDialog.getSaveFileName(self, "CSV Export", "", "CSV Dateien (*.csv)")
+        path, _ = QFileDialog.getSaveFileName(self, "CSV Export", "", "CSV Dateien (*.csv);;Komprimierte CSV (*.csv.gz)")
         if path:
-            export_to_csv(path)
+            from export import export_to_csv
+            self.run_task("CSV Export", lambda path, task: export_to_csv(path, progress=task.progress), path)
 
     def import_csv(self):
         path, _ = QFileDialog.getOpenFileName(self, "CSV Import", "", "CSV Dateien (*.csv)")
         if path:
-            entries = import_from_csv(path)
-            for entry in entries:
-                insert_entry(entry)
-            self.load_entries()
+            from export import import_csv_file
+            self.run_task("CSV Import", lambda path, task: import_csv_file(path, progress=task.progress), path,
+                          on_finished=self.import_finished)
+
+    def import_finished(self, result):
+        self.load_entries()
+        self.check_alerts()
+        QMessageBox.information(
+            self, "CSV Import",
+            f"{result['rows_imported']} von {result['rows_read']} Zeilen neu oder geändert"
+            f" ({result['rows_known']} bereits importiert, {result['rows_skipped'] - result['rows_known']}"
+            f" unverändert oder ungültig). Quelle: {result['source']}"
+        )
     
     def clear_form(self):
         self.weight_input.clear()
@@ -297,34 +569,53 @@ class HealthTracker(QWidget):
     def export_pdf(self):
         path, _ = QFileDialog.getSaveFileName(self, "PDF Export", "", "PDF Dateien (*.pdf)")
         if path:
-            export_to_pdf(path)
+            answer = QMessageBox.question(self, "PDF Export", "Alle Einträge als Tabelle anhängen?\n"
+                                          "(Nein = nur Zusammenfassung und Diagramme)")
+            summary_only = answer != QMessageBox.Yes
+            from export import export_to_pdf
+            self.run_task("PDF Export", lambda path, task: export_to_pdf(
+                path, height_cm=self.user_height_cm, summary_only=summary_only, progress=task.progress), path)
             
     def show_daily_averages(self):
-        data = get_all_entries()
-        from collections import defaultdict
-        daily_data = defaultdict(list)
-
-        for row in data:
-            date = row[1][:10]  # YYYY-MM-DD
-            daily_data[date].append(row)
-
-        latest_day = max(daily_data.keys()) if daily_data else None
-        if not latest_day:
-            return
-
-        entries = daily_data[latest_day]
-
-        avg_weight = sum(e[2] for e in entries) / len(entries)
-        avg_sugar = sum(e[3] for e in entries) / len(entries)
-        avg_sleep = sum(e[4] for e in entries) / len(entries)
-
-        text = f"Durchschnitt {latest_day}:\nGewicht: {avg_weight:.1f} kg\nZucker: {avg_sugar:.1f} mg/dL\nSchlaf: {avg_sleep:.1f} h"
-        
-        from PySide6.QtWidgets import QMessageBox
-        QMessageBox.information(self, "Tagesdurchschnitt", text)
+        self.run_task("Tagesdurchschnitt", latest_daily_average, self.window_start(), self.user_height_cm,
+                      on_finished=self.daily_average_ready)
+
+    def daily_average_ready(self, text):
+        if text:
+            QMessageBox.information(self, "Tagesdurchschnitt", text)
+
+    def show_diagnostics(self):
+        if self.perf_panel is None:
+            from perf_panel import PerfPanel
+            self.perf_panel = PerfPanel()
+        self.perf_panel.show()
+        self.perf_panel.raise_()
+
+    def show_alerts(self):
+        if self.alerts_panel is None:
+            from alerts_panel import AlertsPanel
+            self.alerts_panel = AlertsPanel()
+        self.alerts_panel.show()
+        self.alerts_panel.raise_()
+
+    def closeEvent(self, event):
+        if self.ingest is not None:
+            self.ingest.stop()
+            self.ingest = None
+        self.tasks.cancel_all()
+        self.tasks.wait()
+        if self.perf_panel is not None:
+            self.perf_panel.close()
+        if self.alerts_panel is not None:
+            self.alerts_panel.close()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    argv = STARTUP.parse_args(sys.argv)
+    app = QApplication(argv)
+    STARTUP.mark("QApplication")
+    app.aboutToQuit.connect(close_all_connections)
     window = HealthTracker()
     window.show()
-    sys.exit(app.exec())
+    STARTUP.mark("show()")
+    sys.exit(STARTUP.exit_code(app.exec()))
@@ -0,0 +1,137 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Anzahl der zuletzt gemessenen Operationen, die im Speicher bleiben
+RECENT_SIZE = 500
+# Umgebungsvariable für die optionale JSON-Lines-Trace-Datei
+TRACE_ENV = "DIETLOGGER_TRACE"
+
+_lock = threading.Lock()
+_recent = deque(maxlen=RECENT_SIZE)
+_stats = {}
+_trace_file = None
+
+
+class OpStats:
+    __slots__ = ("count", "total_ms", "max_ms", "rows")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def as_dict(self):
+        return {"count": self.count, "total_ms": self.total_ms, "max_ms": self.max_ms,
+                "avg_ms": self.total_ms / self.count if self.count else 0.0, "rows": self.rows}
+
+
+def record(name, ms, rows=None):
+    """Speichert eine Messung (Dauer in ms, optional verarbeitete Zeilen)."""
+    event = (time.time(), name, ms, rows, threading.current_thread().name)
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = OpStats()
+        stats.count += 1
+        stats.total_ms += ms
+        if ms > stats.max_ms:
+            stats.max_ms = ms
+        if rows:
+            stats.rows += rows
+        _recent.append(event)
+        if _trace_file is not None:
+            _trace_file.write(json.dumps({"ts": event[0], "op": name, "ms": round(ms, 3),
+                                          "rows": rows, "thread": event[4]}) + "\n")
+
+
+class span:
+    """Kontextmanager für Messungen; rows kann im Block gesetzt werden.
+
+        with span("gui.refresh") as s:
+            ...
+            s.rows = n
+    """
+
+    __slots__ = ("name", "rows", "start")
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, (time.perf_counter() - self.start) * 1000, self.rows)
+        return False
+
+
+def timed(name, rows=None):
+    """Dekorator, der jeden Aufruf misst.
+
+    rows ist optional eine Funktion, die aus dem Rückgabewert die Zahl der
+    verarbeiteten Zeilen bestimmt (z.B. len).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            record(name, (time.perf_counter() - start) * 1000,
+                   rows(result) if rows is not None and result is not None else None)
+            return result
+        return wrapper
+    return decorator
+
+
+def recent(limit=None):
+    """Letzte Messungen, neueste zuerst: (Zeit, Name, ms, Zeilen, Thread)."""
+    with _lock:
+        events = list(_recent)
+    events.reverse()
+    return events[:limit] if limit else events
+
+
+def stats():
+    with _lock:
+        return {name: s.as_dict() for name, s in _stats.items()}
+
+
+def reset():
+    with _lock:
+        _recent.clear()
+        _stats.clear()
+
+
+def enable_trace(path):
+    """Schreibt ab jetzt jede Messung als JSON-Zeile nach path (angehängt, gepuffert)."""
+    global _trace_file
+    with _lock:
+        if _trace_file is not None:
+            _trace_file.close()
+        _trace_file = open(path, "a", encoding="utf-8")
+
+
+def disable_trace():
+    global _trace_file
+    with _lock:
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+
+
+def trace_enabled():
+    return _trace_file is not None
+
+
+atexit.register(disable_trace)
+
+if os.environ.get(TRACE_ENV):
+    enable_trace(os.environ[TRACE_ENV])
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import (
+    QCheckBox, QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget
+)
+
+import perf
+
+TRACE_FILE = "dietlogger_trace.jsonl"
+RECENT_ROWS = 100
+
+
+class PerfPanel(QWidget):
+    """Fenster mit den letzten gemessenen Operationen und Summen je Operation."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnose")
+        self.setStyleSheet("background-color: #2b2b2b; color: white;")
+        self.resize(700, 600)
+
+        self.recent_table = QTableWidget(0, 5)
+        self.recent_table.setHorizontalHeaderLabels(["Zeit", "Operation", "ms", "Zeilen", "Thread"])
+        self.stats_table = QTableWidget(0, 5)
+        self.stats_table.setHorizontalHeaderLabels(["Operation", "Anzahl", "Ø ms", "Max ms", "Zeilen"])
+        for table in (self.recent_table, self.stats_table):
+            table.setStyleSheet("background-color: #3c3f41; color: white;")
+            table.verticalHeader().setVisible(False)
+
+        self.trace_checkbox = QCheckBox(f"Trace nach {TRACE_FILE} schreiben")
+        self.trace_checkbox.setChecked(perf.trace_enabled())
+        self.trace_checkbox.toggled.connect(self.toggle_trace)
+        reset_button = QPushButton("Zurücksetzen")
+        reset_button.clicked.connect(self.reset)
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.trace_checkbox)
+        controls.addStretch()
+        controls.addWidget(reset_button)
+
+        layout = QVBoxLayout()
+        layout.addLayout(controls)
+        layout.addWidget(QLabel("Letzte Operationen:"))
+        layout.addWidget(self.recent_table)
+        layout.addWidget(QLabel("Summen je Operation:"))
+        layout.addWidget(self.stats_table)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def toggle_trace(self, enabled):
+        if enabled:
+            perf.enable_trace(TRACE_FILE)
+        else:
+            perf.disable_trace()
+
+    def reset(self):
+        perf.reset()
+        self.refresh()
+
+    def refresh(self):
+        events = perf.recent(RECENT_ROWS)
+        self.recent_table.setRowCount(len(events))
+        for row, (ts, name, ms, rows, thread) in enumerate(events):
+            values = (datetime.fromtimestamp(ts).strftime("%H:%M:%S.%f")[:-3], name,
+                      f"{ms:.1f}", "" if rows is None else str(rows), thread)
+            for col, value in enumerate(values):
+                self.recent_table.setItem(row, col, QTableWidgetItem(value))
+
+        stats = sorted(perf.stats().items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        self.stats_table.setRowCount(len(stats))
+        for row, (name, s) in enumerate(stats):
+            values = (name, str(s["count"]), f"{s['avg_ms']:.1f}", f"{s['max_ms']:.1f}", str(s["rows"]))
+            for col, value in enumerate(values):
+                self.stats_table.setItem(row, col, QTableWidgetItem(value))
@@ -0,0 +1,182 @@
+from collections import OrderedDict
+from io import BytesIO
+
+from reportlab import rl_config
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from analytics import bmi, load_snapshot, summarize, summary_lines
+from database import count_entries, get_data_version, get_summary, iter_entries, on_forget
+from perf import timed
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 40
+LEFT = 50
+FONT = "Helvetica"
+FONT_SIZE = 9
+LINE_HEIGHT = 12
+# Überschrift, x-Position und maximale Zeichenzahl je Spalte
+COLUMNS = [
+    ("Datum", 50, 16),
+    ("Gewicht", 130, 10),
+    ("Zucker", 210, 10),
+    ("Schlaf", 290, 10),
+    ("Befinden", 370, 12),
+    ("Notizen", 450, 24),
+]
+ROWS_PER_PAGE = int((PAGE_HEIGHT - 2 * MARGIN - 2 * LINE_HEIGHT) // LINE_HEIGHT)
+CHART_POINTS = 1500
+ANALYSIS_CACHE_SIZE = 4
+
+_analysis_cache = OrderedDict()
+on_forget(_analysis_cache.clear)
+
+# Seiteninhalte nur mit zlib komprimieren, ohne zusätzliche ASCII85-Kodierung
+rl_config.useA85 = 0
+
+
+def _format(value, width):
+    if value is None:
+        return ""
+    if value.__class__ is float:
+        return f"{value:g}"
+    text = " ".join(str(value).split())
+    return text if len(text) <= width else text[:width - 1] + "…"
+
+
+@timed("pdf.render_charts")
+def render_charts(snapshot, height_cm=0):
+    """Rendert Gewicht, Zucker und BMI mit Agg als PNG."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from charts import BMI_IDEAL_MAX, BMI_IDEAL_MIN, Series
+    from downsample import downsample
+
+    days = snapshot.days
+    fig = Figure(figsize=(7.5, 6), dpi=120)
+    FigureCanvasAgg(fig)
+    axs = fig.subplots(3, 1, sharex=True)
+    axs[0].xaxis_date()
+    series = [(axs[0], Series(days, snapshot.weight), "blue", "Gewicht (kg)"),
+              (axs[1], Series(days, snapshot.sugar), "green", "Zucker (mg/dL)")]
+    if height_cm:
+        series.append((axs[2], Series(days, bmi(snapshot.weight, height_cm)), "orange", "BMI"))
+        axs[2].axhspan(BMI_IDEAL_MIN, BMI_IDEAL_MAX, color="green", alpha=0.1)
+    for ax, data, color, label in series:
+        if len(data.x):
+            xs, ys = downsample(data.x, data.y, data.x[0], data.x[-1], CHART_POINTS)
+            ax.plot(xs, ys, color=color, linewidth=0.8)
+        ax.set_ylabel(label)
+        ax.grid(True)
+    axs[2].set_xlabel("Datum")
+    fig.autofmt_xdate()
+    fig.tight_layout()
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def analyse(start=None, end=None, height_cm=0, charts=True):
+    """Diagramm-PNG und Kennzahlen-Zeilen; gecached je Datenstand und Parametern."""
+    key = (get_data_version(), start, end, height_cm, charts)
+    cached = _analysis_cache.get(key)
+    if cached is not None:
+        _analysis_cache.move_to_end(key)
+        return cached
+    snapshot = load_snapshot(start, end)
+    png = render_charts(snapshot, height_cm) if charts and len(snapshot) else None
+    result = (png, summary_lines(summarize(snapshot, height_cm)))
+    _analysis_cache[key] = result
+    while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+        _analysis_cache.popitem(last=False)
+    return result
+
+
+def _draw_summary(c, y, summary, extra_lines=()):
+    lines = [f"Einträge: {summary['count']}"]
+    if summary["count"]:
+        lines.append(f"Zeitraum: {summary['first']} bis {summary['last']}")
+        for label, key, unit in (("Gewicht", "weight", "kg"), ("Zucker", "sugar", "mg/dL")):
+            if summary[f"{key}_avg"] is not None:
+                lines.append(f"{label}: Ø {summary[f'{key}_avg']:.1f} {unit} "
+                             f"(min {summary[f'{key}_min']:.1f}, max {summary[f'{key}_max']:.1f})")
+        if summary["sleep_avg"] is not None:
+            lines.append(f"Schlaf: Ø {summary['sleep_avg']:.1f} h")
+        lines.extend(extra_lines)
+    text = c.beginText(LEFT, y)
+    text.setFont(FONT, 10)
+    text.setLeading(14)
+    text.textLines(lines)
+    c.drawText(text)
+    return y - 14 * len(lines) - 10
+
+
+@timed("pdf.table_page")
+def _draw_table_page(c, rows, y):
+    c.setFont(FONT, FONT_SIZE)
+    for header, x, _ in COLUMNS:
+        c.drawString(x, y, header)
+    y -= LINE_HEIGHT + 4
+    # Ein Textobjekt pro Spalte statt eines drawString pro Zelle
+    for col, (_, x, width) in enumerate(COLUMNS):
+        text = c.beginText(x, y)
+        text.setFont(FONT, FONT_SIZE)
+        text.setLeading(LINE_HEIGHT)
+        text.textLines([_format(row[col + 1], width) for row in rows])
+        c.drawText(text)
+
+
+def _iter_pages(start, end, rows_per_page):
+    page = []
+    for chunk in iter_entries(start, end):
+        for row in chunk:
+            page.append(row)
+            if len(page) == rows_per_page:
+                yield page
+                page = []
+    if page:
+        yield page
+
+
+def export_report(path, start=None, end=None, height_cm=0, summary_only=False,
+                  include_charts=True, progress=None):
+    """Schreibt den PDF-Bericht: Kennzahlen, Diagramme und (optional) alle Einträge.
+
+    Die Einträge werden seitenweise aus dem Cursor gelesen, der Speicherbedarf
+    ist daher unabhängig von der Anzahl. Gibt die Zahl der Tabellenzeilen zurück.
+    """
+    c = canvas.Canvas(path, pagesize=A4)
+    y = PAGE_HEIGHT - MARGIN
+    c.setFont(FONT, 14)
+    c.drawString(LEFT, y, "Health Tracker Export")
+    y -= 24
+
+    summary = get_summary(start, end)
+    png, analytics_lines = analyse(start, end, height_cm, include_charts) if summary["count"] else (None, [])
+    y = _draw_summary(c, y, summary, analytics_lines)
+
+    if png:
+        image = ImageReader(BytesIO(png))
+        img_width, img_height = image.getSize()
+        width = PAGE_WIDTH - 2 * LEFT
+        height = width * img_height / img_width
+        c.drawImage(image, LEFT, y - height, width=width, height=height)
+        y -= height + 10
+
+    written = 0
+    if not summary_only and summary["count"]:
+        total = count_entries(start, end)
+        c.showPage()
+        for rows in _iter_pages(start, end, ROWS_PER_PAGE):
+            if written:
+                c.showPage()
+            _draw_table_page(c, rows, PAGE_HEIGHT - MARGIN)
+            written += len(rows)
+            if progress:
+                progress(written, written / total)
+
+    c.save()
+    return written
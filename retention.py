@@ -0,0 +1,181 @@
+"""Aufbewahrung: alte Rohwerte zu Stunden- oder Tageswerten verdichten und Speicher freigeben.
+
+Die Regel steht in settings.json neben height_cm:
+
+    {"retention_months": 12, "retention_resolution": "hour"}
+
+Einträge, die älter als retention_months Monate sind, werden je Stunde bzw.
+Tag, Quelle, Befinden und vorhandenen Messwerten zu einer Zeile
+zusammengefasst (Mittelwerte, samples = Anzahl der Rohwerte). Einträge mit
+Bemerkung bleiben unverändert. Die Tagesaggregate (daily_rollup) und damit
+get_averages() bleiben dabei exakt; Diagramme zeigen die Mittelwerte.
+
+Verdichtet wird abschnittsweise in kurzen Transaktionen, danach gibt
+reclaim_space() die frei gewordenen Seiten mit PRAGMA incremental_vacuum in
+kleinen Schritten an das Dateisystem zurück. Beides lässt sich jederzeit
+abbrechen und beim nächsten Lauf fortsetzen.
+
+Die Import-Marken der betroffenen Quellen werden auf das Ende des
+verdichteten Zeitraums vorgezogen, ein normaler Import überspringt die alten
+Zeilen also. Ein Import mit --full schreibt die alten Rohwerte wieder hinein
+und ersetzt dabei die verdichteten Zeilen (siehe database.INSERT_SQL).
+"""
+import calendar
+from datetime import datetime
+
+import database
+from perf import timed
+
+RESOLUTIONS = {"hour": 3600, "day": 86400}
+DEFAULT_RESOLUTION = "hour"
+# Zeitraum pro Transaktion (ganze Tage), damit Formular und Messwert-Annahme nicht lange warten
+DAY_SECONDS = 86400
+BATCH_SECONDS = 7 * DAY_SECONDS
+# Seiten pro incremental_vacuum-Schritt (bei 4 KB-Seiten 4 MB)
+VACUUM_STEP_PAGES = 1000
+
+# Zusammengefasst wird, was in Zeitraum, Quelle, Befinden und vorhandenen Messwerten
+# übereinstimmt. Da in einer Gruppe jeder Messwert entweder immer oder nie fehlt,
+# ergeben Mittelwert * samples wieder genau die Summen der Rohwerte.
+PATTERN = "(weight IS NULL) + 2 * (blood_sugar IS NULL) + 4 * (sleep_hours IS NULL)"
+GROUP_TABLE_SQL = '''
+    CREATE TEMP TABLE IF NOT EXISTS compact_group (
+        bucket INTEGER, source TEXT, mood INTEGER, pattern INTEGER,
+        ts INTEGER, weight REAL, blood_sugar REAL, sleep_hours REAL, samples INTEGER
+    )
+'''
+GROUP_INDEX_SQL = "CREATE INDEX IF NOT EXISTS temp.idx_compact_group ON compact_group (bucket, source)"
+EXTREMES_TABLE_SQL = "CREATE TEMP TABLE IF NOT EXISTS compact_extremes (day TEXT PRIMARY KEY, {columns})".format(
+    columns=", ".join(f"{m}_{f} REAL" for m in database.ROLLUP_METRICS for f in ("min", "max")))
+GROUP_SQL = f'''
+    INSERT INTO temp.compact_group
+    SELECT ts - ts % :bucket, source, mood, {PATTERN}, MIN(ts),
+           SUM(weight * samples) / SUM(samples), SUM(blood_sugar * samples) / SUM(samples),
+           SUM(sleep_hours * samples) / SUM(samples), SUM(samples)
+    FROM entry WHERE ts >= :start AND ts < :end AND coalesce(notes, '') = ''
+    GROUP BY ts - ts % :bucket, source, mood, {PATTERN}
+    HAVING COUNT(*) > 1
+'''
+DELETE_SQL = f'''
+    DELETE FROM entry WHERE ts >= :start AND ts < :end AND coalesce(notes, '') = '' AND EXISTS (
+        SELECT 1 FROM temp.compact_group g
+        WHERE g.bucket = entry.ts - entry.ts % :bucket AND g.source = entry.source
+          AND g.mood IS entry.mood AND g.pattern = {PATTERN.replace("(", "(entry.")}
+    )
+'''
+# MIN(ts) je Gruppe ist der Zeitpunkt eines gerade gelöschten Rohwerts, (ts, source) bleibt eindeutig
+INSERT_SQL = '''
+    INSERT INTO entry (ts, weight, blood_sugar, sleep_hours, mood, notes, source, samples)
+    SELECT ts, weight, blood_sugar, sleep_hours, mood, '', source, samples FROM temp.compact_group
+'''
+# Quellen mit verdichteten Zeilen und die letzte verdichtete Minute als Import-Marke
+SOURCES_SQL = f'''
+    SELECT DISTINCT source, {database.TS_TO_TEXT.format(":end - 60")} FROM entry
+    WHERE ts < :end AND samples > 1
+'''
+# Anzahl und Summen in daily_rollup stimmen nach Löschen und Einfügen wieder, Min/Max
+# aber nicht, wenn ein Tag dabei ganz geleert und neu angelegt wird: vorher sichern
+EXTREMES = [f"{m}_{f}" for m in database.ROLLUP_METRICS for f in ("min", "max")]
+SAVE_EXTREMES_SQL = f'''
+    INSERT INTO temp.compact_extremes
+    SELECT day, {", ".join(EXTREMES)} FROM daily_rollup
+    WHERE day >= date(:start, 'unixepoch') AND day < date(:end, 'unixepoch')
+'''
+RESTORE_EXTREMES_SQL = f'''
+    UPDATE daily_rollup SET ({", ".join(EXTREMES)}) = (
+        SELECT {", ".join(EXTREMES)} FROM temp.compact_extremes e WHERE e.day = daily_rollup.day
+    ) WHERE day IN (SELECT day FROM temp.compact_extremes)
+'''
+
+
+def policy_from_settings(settings):
+    """(Monate, Auflösung) aus den Einstellungen oder None, wenn nichts verdichtet werden soll."""
+    months = settings.get("retention_months") or 0
+    if months <= 0:
+        return None
+    resolution = settings.get("retention_resolution", DEFAULT_RESOLUTION)
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unbekannte Auflösung: {resolution}")
+    return months, resolution
+
+
+def cutoff(months, now=None):
+    """Beginn des Tages vor months Monaten; ältere Einträge werden verdichtet."""
+    now = now or datetime.now()
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    day = min(now.day, calendar.monthrange(year, month + 1)[1])
+    return datetime(year, month + 1, day)
+
+
+@timed("retention.compact", rows=lambda r: r["rows_removed"])
+def compact(before, resolution=DEFAULT_RESOLUTION, progress=None):
+    """Verdichtet alle Einträge vor before (datetime oder Text) auf die Auflösung.
+
+    Gibt rows_before, rows_after und rows_removed (Zeilen in entry) zurück.
+    progress(bisher entfernte Zeilen, Anteil) wird nach jedem Abschnitt
+    aufgerufen und darf zum Abbrechen eine Ausnahme auslösen; bereits
+    verdichtete Abschnitte bleiben dann erhalten.
+    """
+    bucket = RESOLUTIONS[resolution]
+    end = database.to_epoch(before)
+    end -= end % bucket
+    conn = database.get_connection()
+    first, rows_before = conn.execute("SELECT MIN(ts), COUNT(*) FROM entry WHERE ts < ?", (end,)).fetchone()
+    if first is None:
+        return {"rows_before": 0, "rows_after": 0, "rows_removed": 0}
+    conn.execute(GROUP_TABLE_SQL)
+    conn.execute(GROUP_INDEX_SQL)
+    conn.execute(EXTREMES_TABLE_SQL)
+    start = first - first % DAY_SECONDS
+    steps = -(-(end - start) // BATCH_SECONDS)
+    removed = 0
+    for step in range(steps):
+        params = {"bucket": bucket, "start": start + step * BATCH_SECONDS,
+                  "end": min(start + (step + 1) * BATCH_SECONDS, end)}
+        with database.transaction() as conn:
+            conn.execute("DELETE FROM temp.compact_group")
+            groups = conn.execute(GROUP_SQL, params).rowcount
+            if groups:
+                conn.execute("DELETE FROM temp.compact_extremes")
+                conn.execute(SAVE_EXTREMES_SQL, params)
+                removed += conn.execute(DELETE_SQL, params).rowcount - groups
+                conn.execute(INSERT_SQL)
+                conn.execute(RESTORE_EXTREMES_SQL)
+        if progress:
+            progress(removed, (step + 1) / steps)
+    with database.transaction() as conn:
+        for source, last in conn.execute(SOURCES_SQL, {"end": end}).fetchall():
+            database.set_watermark(source, last, conn)
+    rows_after = conn.execute("SELECT COUNT(*) FROM entry WHERE ts < ?", (end,)).fetchone()[0]
+    return {"rows_before": rows_before, "rows_after": rows_after, "rows_removed": rows_before - rows_after}
+
+
+@timed("retention.reclaim_space")
+def reclaim_space(max_pages=None, progress=None):
+    """Gibt freie Seiten schrittweise frei (nur bei auto_vacuum = INCREMENTAL); gibt die Anzahl zurück."""
+    conn = database.get_connection()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != database.AUTO_VACUUM_INCREMENTAL:
+        return 0
+    total = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if max_pages is not None:
+        total = min(total, max_pages)
+    freed = 0
+    while freed < total:
+        step = min(VACUUM_STEP_PAGES, total - freed)
+        # execute() führt das Pragma nur einen Schritt (= eine Seite) weit aus
+        conn.executescript(f"PRAGMA incremental_vacuum({step});")
+        freed += step
+        if progress:
+            progress(freed, freed / total)
+    return freed
+
+
+def apply_policy(months, resolution=DEFAULT_RESOLUTION, progress=None):
+    """Verdichtet nach der Regel und gibt den Platz frei; Ergebnis wie compact() plus pages_freed.
+
+    Freie Seiten eines abgebrochenen früheren Laufs werden ebenfalls freigegeben.
+    """
+    result = compact(cutoff(months), resolution, progress)
+    rows = result["rows_removed"]
+    result["pages_freed"] = reclaim_space(progress=progress and (lambda pages, fraction: progress(rows, fraction)))
+    return result
@@ -0,0 +1,85 @@
+import json
+import sys
+import time
+
+# Phase, ab der das Fenster als sichtbar gilt (Time-to-First-Window)
+FIRST_WINDOW_MARK = "Fenster angezeigt"
+
+
+class StartupProfile:
+    """Misst die Startphasen (Importe, Initialisierung, erstes Diagramm).
+
+    Aktiv nur mit --profile-startup: dann wird nach dem ersten Diagramm
+    eine Aufschlüsselung auf stderr ausgegeben und die Anwendung beendet.
+    Mit --startup-budget MS endet der Prozess mit Code 1, wenn das Fenster
+    später als MS Millisekunden nach Programmstart erscheint. Mit
+    --startup-json PFAD werden die Phasen zusätzlich als JSON geschrieben.
+    """
+
+    def __init__(self, t0=None):
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self.last = self.t0
+        self.phases = []
+        self.enabled = False
+        self.budget_ms = None
+        self.json_path = None
+        self.finished = False
+
+    def parse_args(self, argv):
+        """Entfernt die eigenen Optionen aus argv und gibt den Rest zurück."""
+        rest = []
+        args = iter(argv)
+        for arg in args:
+            if arg == "--profile-startup":
+                self.enabled = True
+            elif arg == "--startup-budget":
+                self.enabled = True
+                self.budget_ms = float(next(args))
+            elif arg == "--startup-json":
+                self.enabled = True
+                self.json_path = next(args)
+            else:
+                rest.append(arg)
+        return rest
+
+    def mark(self, name, final=False):
+        if self.finished:
+            return
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000, (now - self.t0) * 1000))
+        self.last = now
+        if final:
+            self.finished = True
+            if self.enabled:
+                self.report()
+                from PySide6.QtWidgets import QApplication
+                QApplication.quit()
+
+    def elapsed_ms(self, name):
+        for phase, _, total in self.phases:
+            if phase == name:
+                return total
+        return None
+
+    def report(self, stream=sys.stderr):
+        print(f"{'Phase':<28} {'Dauer (ms)':>11} {'Gesamt (ms)':>12}", file=stream)
+        for name, duration, total in self.phases:
+            print(f"{name:<28} {duration:>11.1f} {total:>12.1f}", file=stream)
+        first_window = self.elapsed_ms(FIRST_WINDOW_MARK)
+        if first_window is not None:
+            print(f"Time-to-First-Window: {first_window:.1f} ms", file=stream)
+        if self.json_path:
+            with open(self.json_path, "w") as f:
+                json.dump({
+                    "phases": [{"name": n, "ms": d, "total_ms": t} for n, d, t in self.phases],
+                    "first_window_ms": first_window,
+                }, f, indent=2)
+
+    def exit_code(self, code):
+        """Exit-Code der Anwendung, ggf. 1 bei überschrittenem Budget."""
+        if code == 0 and self.budget_ms is not None:
+            first_window = self.elapsed_ms(FIRST_WINDOW_MARK)
+            if first_window is None or first_window > self.budget_ms:
+                print(f"Startbudget von {self.budget_ms:.0f} ms überschritten", file=sys.stderr)
+                return 1
+        return code
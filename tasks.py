@@ -0,0 +1,98 @@
+import threading
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class TaskCancelled(Exception):
+    """Wird im Worker ausgelöst, wenn die Aufgabe abgebrochen wurde."""
+
+
+class TaskSignals(QObject):
+    progress = Signal(int, float)   # verarbeitete Zeilen, Anteil 0..1 (negativ = unbekannt)
+    finished = Signal(object)       # Ergebnis der Funktion
+    failed = Signal(str)            # Fehlermeldung
+    cancelled = Signal()
+
+
+class Task(QRunnable):
+    """Führt func(*args, task=self, **kwargs) in einem Thread des QThreadPool aus.
+
+    Die Funktion meldet Fortschritt über task.progress(rows, fraction); bei
+    einem Abbruch löst dieser Aufruf TaskCancelled aus. Die Signale werden im
+    GUI-Thread zugestellt, Ergebnisse also erst dort übernommen.
+    """
+
+    def __init__(self, name, func, *args, **kwargs):
+        super().__init__()
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def progress(self, rows, fraction=-1.0):
+        if self._cancel.is_set():
+            raise TaskCancelled(self.name)
+        self.signals.progress.emit(rows, fraction)
+
+    def run(self):
+        try:
+            result = self.func(*self.args, task=self, **self.kwargs)
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(str(e))
+        else:
+            if self._cancel.is_set():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(result)
+
+
+class TaskRunner(QObject):
+    """Startet Tasks im globalen Thread-Pool und hält sie bis zum Ende am Leben."""
+
+    started = Signal(object)
+    done = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool.globalInstance()
+        self.active = []
+
+    def start(self, task, on_finished=None, on_failed=None, on_progress=None, on_cancelled=None):
+        if on_finished:
+            task.signals.finished.connect(on_finished)
+        if on_failed:
+            task.signals.failed.connect(on_failed)
+        if on_cancelled:
+            task.signals.cancelled.connect(on_cancelled)
+        if on_progress:
+            task.signals.progress.connect(on_progress)
+        for signal in (task.signals.finished, task.signals.failed, task.signals.cancelled):
+            signal.connect(lambda *_, t=task: self._done(t))
+        self.active.append(task)
+        self.started.emit(task)
+        self.pool.start(task)
+        return task
+
+    def _done(self, task):
+        if task in self.active:
+            self.active.remove(task)
+            self.done.emit(task)
+
+    def cancel_all(self):
+        for task in list(self.active):
+            task.cancel()
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)